@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'PortfolioLab.settings')
+os.environ.setdefault('PORTFOLIOLAB_URLCONF', 'PortfolioLab.async_urls')
 
 application = get_asgi_application()
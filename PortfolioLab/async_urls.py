@@ -0,0 +1,25 @@
+"""
+URL configuration used by the ASGI deployment.
+
+Same routes as PortfolioLab.urls, with the read-heavy views swapped for their
+native async implementations from PortfolioLab_app.async_views.
+"""
+from django.urls import path
+
+from PortfolioLab.urls import urlpatterns as sync_urlpatterns
+from PortfolioLab_app.async_views import (AsyncMainView, AsyncUserDonation, AsyncAllInstitutionView,
+                                          AsyncInstitutionMatchView)
+from PortfolioLab_app.page_cache import cache_anonymous_page
+
+async_views = {
+    'main': cache_anonymous_page(AsyncMainView.as_view()),
+    'my_donation': AsyncUserDonation.as_view(),
+    'all_institution': AsyncAllInstitutionView.as_view(),
+    'institution_matches': AsyncInstitutionMatchView.as_view(),
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), async_views[pattern.name], name=pattern.name)
+    if getattr(pattern, 'name', None) in async_views else pattern
+    for pattern in sync_urlpatterns
+]
@@ -42,7 +42,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'PortfolioLab_app.instrumentation.QueryInstrumentationMiddleware',
+    'PortfolioLab_app.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'PortfolioLab_app.static_assets.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,11 +54,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'PortfolioLab.urls'
+# asgi.py switches to PortfolioLab.async_urls, which serves the async views.
+ROOT_URLCONF = os.environ.get('PORTFOLIOLAB_URLCONF', 'PortfolioLab.urls')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'PortfolioLab_app.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates']
         ,
         'APP_DIRS': True,
@@ -66,6 +70,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Template profiler, viewable by staff at /template_profile/.
+            'profile': os.environ.get('PORTFOLIOLAB_TEMPLATE_PROFILE') == '1',
         },
     },
 ]
@@ -87,6 +93,68 @@ DATABASES = {
     }
 }
 
+# Optional streaming replica for read-only views (see PortfolioLab_app/routers.py).
+# Clients stay on the primary for REPLICA_PIN_SECONDS after a write.
+if os.environ.get('PORTFOLIOLAB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['PORTFOLIOLAB_REPLICA_HOST'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['PortfolioLab_app.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Catalogue and page caches are invalidated through this backend, so deployments
+# running several worker processes should point it at a shared cache (Redis, Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Full-page cache for anonymous visitors (see PortfolioLab_app/page_cache.py)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 5
+PAGE_CACHE_STALE_TIMEOUT = 60 * 60
+
+# archive_donations moves taken donations older than this out of the hot table.
+DONATION_ARCHIVE_AFTER_DAYS = 365
+
+# Login, registration and password reset throttling (see PortfolioLab_app/throttle.py).
+# Each rule is (attempts, seconds) per client IP or per submitted username.
+THROTTLE_RULES = {
+    'login': {'ip': (20, 60), 'username': (5, 60 * 5)},
+    'registration': {'ip': (5, 60 * 60)},
+    'reset': {'ip': (5, 60 * 60), 'username': (3, 60 * 60)},
+}
+
+# Logging
+# https://docs.djangoproject.com/en/4.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'PortfolioLab_app.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Emails are matched case-insensitively through a unique index on lower(username).
+AUTHENTICATION_BACKENDS = ['PortfolioLab_app.backends.EmailBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -123,6 +191,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# collectstatic (or build_static) writes content-hashed names, a manifest and
+# .br/.gz variants; PrecompressedStaticMiddleware serves them from STATIC_ROOT.
+# Brotli variants need the optional ``brotli`` package. With DEBUG off,
+# {% static %} fails until the manifest has been built; test_settings.py
+# switches back to plain StaticFilesStorage for that reason.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'PortfolioLab_app.static_assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,40 @@
+# Settings for the test suite: python manage.py test --settings=PortfolioLab.test_settings
+# Two separate SQLite databases stand in for the primary and its replica, so the
+# router tests can see which one a query went to.
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test-primary.sqlite3'),
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test-replica.sqlite3'),
+    },
+}
+
+# The manifest storage needs collectstatic first, and tests run with DEBUG off.
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Query budgets are asserted by the tests, so the per-request log lines would
+# only clutter the output.
+LOGGING = {
+    **LOGGING,
+    'handlers': {
+        'null': {
+            'class': 'logging.NullHandler',
+        },
+    },
+    'loggers': {
+        'PortfolioLab_app.performance': {
+            'handlers': ['null'],
+            'propagate': False,
+        },
+    },
+}
@@ -22,15 +22,19 @@ from PortfolioLab_app.views import (MainView, DonationView, LoginView, Registrat
                                     InstitutionCreateView, UserInfoView, CategoryCreateView, UserDonation, SuccessView,
                                     AllInstitutionView, InstitutionDeleteView, InstitutionUpdateView, UserUpdateView,
                                     DonationUpdateView, AllDonationView, EmailVerifyView, ResetPasswordSearchUserView,
-                                    ResetPasswordView)
+                                    ResetPasswordView, DonationIntakeView, DonationExportView,
+                                    DonationBulkTakeView, PickupPlanView, InstitutionMatchView,
+                                    ThrottleStatsView, TemplateProfileView, InstitutionSearchView,
+                                    DonationAnalyticsView)
+from PortfolioLab_app.page_cache import cache_anonymous_page
 
 urlpatterns = [
     path('admin/', admin.site.urls  ),
-    path('', MainView.as_view(), name='main'),
+    path('', cache_anonymous_page(MainView.as_view()), name='main'),
     path('registration/', RegistrationView.as_view(), name='registration'),
-    path('confirm_email/', TemplateView.as_view(template_name='confirm_email.html'), name='confirm_email'),
+    path('confirm_email/', cache_anonymous_page(TemplateView.as_view(template_name='confirm_email.html')), name='confirm_email'),
     path('verify_email/<uidb64>/<token>/',EmailVerifyView.as_view(), name='verify_email'),
-    path('invalid_verify/', TemplateView.as_view(template_name='invalid_verify.html'), name='invalid_verify'),
+    path('invalid_verify/', cache_anonymous_page(TemplateView.as_view(template_name='invalid_verify.html')), name='invalid_verify'),
     path('reset_password/', ResetPasswordSearchUserView.as_view(), name='search_user'),
     path('reset_password/<uidb64>/<token>/', ResetPasswordView.as_view(), name='reset_password'),
     path('login/', LoginView.as_view(), name='login'),
@@ -38,7 +42,16 @@ urlpatterns = [
     path('userinfo/<int:user_id>/', UserInfoView.as_view(), name='profil'),
     path('user_update/<int:pk>/', UserUpdateView.as_view(), name='user_update'),
     path('donation/', DonationView.as_view(), name='donation'),
+    path('api/institutions/', InstitutionMatchView.as_view(), name='institution_matches'),
+    path('search/', InstitutionSearchView.as_view(), name='institution_search'),
     path('all_donation/', AllDonationView.as_view(), name='all_donation'),
+    path('api/donations/bulk/', DonationIntakeView.as_view(), name='donation_intake'),
+    path('all_donation/export/', DonationExportView.as_view(), name='donation_export'),
+    path('all_donation/take/', DonationBulkTakeView.as_view(), name='donation_bulk_take'),
+    path('pickups/', PickupPlanView.as_view(), name='pickup_plan'),
+    path('analytics/', DonationAnalyticsView.as_view(), name='donation_analytics'),
+    path('api/throttle/', ThrottleStatsView.as_view(), name='throttle_stats'),
+    path('template_profile/', TemplateProfileView.as_view(), name='template_profile'),
     path('my_donation/', UserDonation.as_view(), name='my_donation'),
     path('update_donation/<int:pk>/', DonationUpdateView.as_view(), name='update_donation'),
     path('institution/', AllInstitutionView.as_view(), name='all_institution'),
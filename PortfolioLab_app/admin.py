@@ -1,9 +1,17 @@
 from django.contrib import admin
-from .models import Institution
+from .models import ApiToken, Donation, Institution
+from .pagination import EstimatedCountPaginator
+from .pickups import mark_donations_taken
 
 @admin.register(Institution)
 class InstitutionAdmin(admin.ModelAdmin):
-    list_display = ('name', 'type_name', 'description', 'category_list')
+    list_display = ('name', 'type_name', 'email', 'description', 'category_list')
+    list_filter = ('type',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('category')
 
     def type_name(self, obj):
         return obj.get_type_display()
@@ -11,4 +19,44 @@ class InstitutionAdmin(admin.ModelAdmin):
 
     def category_list(self, obj):
         return ", ".join([category.name for category in obj.category.all()])
-    category_list.short_description = 'Categories'
\ No newline at end of file
+    category_list.short_description = 'Categories'
+
+
+@admin.register(Donation)
+class DonationAdmin(admin.ModelAdmin):
+    # Filters and sorting are limited to indexed columns, and the changelist
+    # count is estimated, so the page stays fast on millions of donations.
+    list_display = ('id', 'institution', 'user', 'quantity', 'category_list', 'city', 'pick_up_date',
+                    'pick_up_time', 'is_taken')
+    list_select_related = ('institution', 'user')
+    list_filter = ('is_taken', ('pick_up_date', admin.DateFieldListFilter))
+    sortable_by = ('id', 'pick_up_date')
+    ordering = ('-pick_up_date', '-id')
+    raw_id_fields = ('institution', 'user')
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['mark_taken']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('categories')
+
+    def category_list(self, obj):
+        return ", ".join([category.name for category in obj.categories.all()])
+    category_list.short_description = 'Categories'
+
+    @admin.action(description='Oznacz jako odebrane')
+    def mark_taken(self, request, queryset):
+        updated = mark_donations_taken(queryset)
+        self.message_user(request, f'Oznaczono jako odebrane: {updated}')
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    # Keys are created with the create_api_token command; revoke by deleting.
+    list_display = ('name', 'user', 'created', 'last_used')
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'name', 'key_hash', 'created', 'last_used')
+
+    def has_add_permission(self, request):
+        return False
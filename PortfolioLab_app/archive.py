@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import ArchivedDonation, Donation
+
+# Set while donations are moved to the archive, so the delete signals leave
+# the all-time stats, the rollups and the page cache alone.
+archiving = ContextVar('archiving', default=False)
+
+
+def archive_cutoff(days):
+    return date.today() - timedelta(days=days)
+
+
+def archivable_donations(cutoff):
+    return Donation.objects.filter(is_taken=True, pick_up_date__lt=cutoff).order_by('pick_up_date', 'pk')
+
+
+def archive_batch(cutoff, batch_size=500):
+    """Move one batch of taken donations older than ``cutoff``; returns how many were moved."""
+    Link = Donation.categories.through
+    ArchivedLink = ArchivedDonation.categories.through
+    with transaction.atomic():
+        # Rows being edited right now are skipped and picked up by a later run.
+        donations = list(archivable_donations(cutoff).select_for_update(skip_locked=True)[:batch_size])
+        if not donations:
+            return 0
+        donation_ids = [donation.pk for donation in donations]
+        ArchivedDonation.objects.bulk_create([
+            ArchivedDonation(**{field.attname: getattr(donation, field.attname)
+                                for field in Donation._meta.concrete_fields})
+            for donation in donations
+        ], ignore_conflicts=True)
+        ArchivedLink.objects.bulk_create([
+            ArchivedLink(archiveddonation_id=donation_id, category_id=category_id)
+            for donation_id, category_id in Link.objects.filter(donation_id__in=donation_ids)
+            .values_list('donation_id', 'category_id')
+        ], ignore_conflicts=True)
+
+        token = archiving.set(True)
+        try:
+            Donation.objects.filter(pk__in=donation_ids).delete()
+        finally:
+            archiving.reset(token)
+    return len(donation_ids)
+
+
+def donation_model(history):
+    return ArchivedDonation if history else Donation
@@ -0,0 +1,90 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import AccessMixin
+from django.db.models import Count, Sum
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
+
+from .catalogue import aget_institution_catalogue
+from .category_index import get_category_index
+from .models import Institution
+from .pagination import akeyset_paginate
+from .stats import aget_donation_stats
+from .views import MainView, UserDonation, history_filter, is_taken_filter, match_etag, parse_category_ids
+
+
+@sync_to_async
+def load_user(request):
+    # Touching the lazy request.user runs the session and user queries here,
+    # off the event loop, so templates can read it afterwards.
+    request.user.is_authenticated
+    return request.user
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    async def dispatch(self, request, *args, **kwargs):
+        user = await load_user(request)
+        if not self.has_access(user):
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
+    def has_access(self, user):
+        return user.is_authenticated
+
+
+class AsyncStaffRequiredMixin(AsyncLoginRequiredMixin):
+    def has_access(self, user):
+        return user.is_authenticated and user.is_staff
+
+
+class AsyncMainView(MainView):
+    async def get(self, request):
+        stats, catalogue, _ = await asyncio.gather(
+            aget_donation_stats(), aget_institution_catalogue(), load_user(request))
+        return render(request, 'index.html', self.get_context(stats, catalogue, request.GET.get('page')))
+
+
+class AsyncUserDonation(AsyncLoginRequiredMixin, UserDonation):
+    async def get(self, request):
+        is_taken = is_taken_filter(request)
+        history = history_filter(request)
+        user_donations, per_institution, donations = self.get_querysets(request.user, is_taken, history)
+        summary, per_institution, page = await asyncio.gather(
+            user_donations.aaggregate(total_quantity=Sum('quantity'), donation_count=Count('id')),
+            self.fetch(per_institution),
+            akeyset_paginate(donations, request.GET.get('cursor'), self.paginate_by),
+        )
+        return render(request, 'user_donation.html',
+                      self.get_context(is_taken, summary, per_institution, page, history))
+
+    @staticmethod
+    async def fetch(queryset):
+        return [row async for row in queryset]
+
+
+class AsyncAllInstitutionView(AsyncStaffRequiredMixin, View):
+    read_replica = True
+
+    async def get(self, request):
+        all_institution = [institution async for institution in Institution.objects.prefetch_related('category')]
+        return render(request, 'all_institution.html', {'all_institution': all_institution})
+
+
+class AsyncInstitutionMatchView(View):
+    read_replica = True
+
+    async def get(self, request):
+        index = await sync_to_async(get_category_index)()
+        category_ids = parse_category_ids(request)
+        etag = quote_etag(match_etag(index.version, category_ids))
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse({'institutions': index.match(category_ids)})
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=60)
+        return response
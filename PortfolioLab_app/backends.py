@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def users_by_email(email):
+    # Compared through lower(username), so the lookup is a probe of the
+    # auth_user_username_lower_key index.
+    return UserModel._default_manager.alias(username_lower=Lower('username')).filter(
+        username_lower=normalize_email(email))
+
+
+class EmailBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = users_by_email(username).get()
+        except UserModel.DoesNotExist:
+            # Hash anyway, so a missing account takes as long as a wrong password.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
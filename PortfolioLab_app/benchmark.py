@@ -0,0 +1,169 @@
+import asyncio
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .models import Category
+from .seed import SEED_PASSWORD
+
+ASGI_URLCONF = 'PortfolioLab.async_urls'
+
+
+class Endpoint:
+    def __init__(self, name, path, method='GET', user=None, data=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.user = user
+        self.data = data
+
+
+def default_endpoints():
+    staff = User.objects.filter(is_staff=True).order_by('pk').first()
+    donor = User.objects.filter(is_staff=False).order_by('pk').first()
+    pick_up_date = (date.today() + timedelta(days=7)).isoformat()
+    category_ids = ','.join(str(pk) for pk in Category.objects.order_by('pk').values_list('pk', flat=True)[:2])
+    return [
+        Endpoint('main', '/'),
+        Endpoint('main page 2', '/?page=2'),
+        Endpoint('donation form', '/donation/', user=donor),
+        Endpoint('donation post', '/donation/', 'POST', donor, {
+            'organization': 'Instytucja 0', 'categories': ['Kategoria 0', 'Kategoria 1'], 'bags': '3',
+            'address': 'ul. Testowa 1', 'phone': '500000000', 'city': 'Warszawa', 'postcode': '00-001',
+            'data': pick_up_date, 'time': '10:00', 'more_info': '',
+        }),
+        Endpoint('all_donation', '/all_donation/', user=staff),
+        Endpoint('all_donation is_taken=0', '/all_donation/?is_taken=0', user=staff),
+        Endpoint('my_donation', '/my_donation/', user=donor),
+        Endpoint('all_institution', '/institution/', user=staff),
+        Endpoint('institution matches', f'/api/institutions/?categories={category_ids}'),
+        Endpoint('login', '/login/', 'POST', data={'login': donor.username, 'password': SEED_PASSWORD}),
+    ]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _client(endpoint, client_class=Client):
+    client = client_class()
+    if endpoint.user is not None:
+        client.force_login(endpoint.user)
+    return client
+
+
+def _timed_request(client, endpoint):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        try:
+            if endpoint.method == 'POST':
+                response = client.post(endpoint.path, endpoint.data)
+            else:
+                response = client.get(endpoint.path)
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - start
+    return elapsed, len(queries), failed
+
+
+def _worker(client, endpoint, count):
+    try:
+        return [_timed_request(client, endpoint) for _ in range(count)]
+    finally:
+        connections.close_all()
+
+
+def benchmark_endpoint(endpoint, requests=200, concurrency=8, warmup=5):
+    # Clients log in up front, so the timed phase only measures the endpoint.
+    clients = [_client(endpoint) for _ in range(concurrency)]
+    for client in clients[:1]:
+        for _ in range(warmup):
+            _timed_request(client, endpoint)
+    shares = [requests // concurrency + (1 if n < requests % concurrency else 0) for n in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for batch in pool.map(_worker, clients, [endpoint] * concurrency, shares)
+                   for sample in batch]
+    wall_time = time.perf_counter() - start
+    return summarize(samples, wall_time)
+
+
+def _server_timing_queries(response):
+    # Async queries run in sync_to_async threads, out of reach of
+    # CaptureQueriesContext, so ASGI runs read the middleware's count.
+    match = re.search(r'desc="(\d+) queries"', response.get('Server-Timing', ''))
+    return int(match.group(1)) if match else 0
+
+
+async def _atimed_request(client, endpoint):
+    start = time.perf_counter()
+    queries = 0
+    try:
+        if endpoint.method == 'POST':
+            response = await client.post(endpoint.path, endpoint.data)
+        else:
+            response = await client.get(endpoint.path)
+        queries = _server_timing_queries(response)
+        failed = response.status_code >= 400
+    except Exception:
+        failed = True
+    return time.perf_counter() - start, queries, failed
+
+
+async def _aworker(client, endpoint, count):
+    return [await _atimed_request(client, endpoint) for _ in range(count)]
+
+
+async def _abenchmark(clients, endpoint, shares, warmup):
+    for _ in range(warmup):
+        await _atimed_request(clients[0], endpoint)
+    start = time.perf_counter()
+    batches = await asyncio.gather(*(_aworker(client, endpoint, share) for client, share in zip(clients, shares)))
+    return [sample for batch in batches for sample in batch], time.perf_counter() - start
+
+
+def benchmark_endpoint_asgi(endpoint, requests=200, concurrency=8, warmup=5):
+    # Same load as benchmark_endpoint, but the concurrent clients share one
+    # event loop and go through the ASGI handler and the async URLconf.
+    clients = [_client(endpoint, AsyncClient) for _ in range(concurrency)]
+    shares = [requests // concurrency + (1 if n < requests % concurrency else 0) for n in range(concurrency)]
+    with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+        samples, wall_time = asyncio.run(_abenchmark(clients, endpoint, shares, warmup))
+    return summarize(samples, wall_time)
+
+
+def summarize(samples, wall_time):
+    latencies = [elapsed * 1000 for elapsed, _, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, failed in samples if failed),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'requests_per_second': round(len(samples) / wall_time, 2),
+        'queries_per_request': round(sum(queries for _, queries, _ in samples) / len(samples), 2),
+    }
+
+
+def compare(current, previous):
+    rows = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        rows.append((name, {
+            key: round((result[key] - before[key]) / before[key] * 100, 1) if before[key] else None
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'requests_per_second', 'queries_per_request')
+        }))
+    return rows
@@ -0,0 +1,67 @@
+import asyncio
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import TYPE, Category, Institution
+
+CATALOGUE_CACHE_KEY = 'institution_catalogue'
+CATALOGUE_TIMEOUT = 60 * 60
+
+
+def get_institution_catalogue():
+    catalogue = cache.get(CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        catalogue = build_institution_catalogue()
+        cache.set(CATALOGUE_CACHE_KEY, catalogue, CATALOGUE_TIMEOUT)
+    return catalogue
+
+
+async def aget_institution_catalogue():
+    catalogue = await cache.aget(CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        catalogue = await abuild_institution_catalogue()
+        await cache.aset(CATALOGUE_CACHE_KEY, catalogue, CATALOGUE_TIMEOUT)
+    return catalogue
+
+
+def _catalogue_querysets():
+    # Built from the primary: a copy read from a lagging replica would stay
+    # cached until the next change.
+    return (
+        Category.objects.using(DEFAULT_DB_ALIAS).values_list('id', 'name'),
+        Institution.category.through.objects.using(DEFAULT_DB_ALIAS).order_by('category_id')
+        .values_list('institution_id', 'category_id'),
+        Institution.objects.using(DEFAULT_DB_ALIAS).order_by('name').values('id', 'name', 'description', 'type'),
+    )
+
+
+def build_institution_catalogue():
+    categories, links, institutions = _catalogue_querysets()
+    return group_catalogue(categories, links, institutions)
+
+
+async def abuild_institution_catalogue():
+    async def fetch(queryset):
+        return [row async for row in queryset]
+
+    categories, links, institutions = await asyncio.gather(*map(fetch, _catalogue_querysets()))
+    return group_catalogue(categories, links, institutions)
+
+
+def group_catalogue(categories, links, institutions):
+    category_names = dict(categories)
+    institution_categories = defaultdict(list)
+    for institution_id, category_id in links:
+        institution_categories[institution_id].append(category_names[category_id])
+
+    catalogue = {institution_type: [] for institution_type, _ in TYPE}
+    for institution in institutions:
+        institution['categories'] = institution_categories[institution['id']]
+        catalogue.setdefault(institution['type'], []).append(institution)
+    return catalogue
+
+
+def invalidate_institution_catalogue():
+    cache.delete(CATALOGUE_CACHE_KEY)
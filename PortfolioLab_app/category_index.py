@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Institution
+
+VERSION_KEY = 'category_index:version'
+
+_lock = threading.Lock()
+_index = None
+
+
+class CategoryIndex:
+    # Each institution's categories are kept as one int with one bit set per
+    # category, so matching is an AND plus a popcount per institution. Bits
+    # are numbered densely over the linked categories, never by raw id.
+
+    def __init__(self, version, institutions, masks, bits):
+        self.version = version
+        self.institutions = institutions
+        self.masks = masks
+        self.bits = bits
+
+    @classmethod
+    def build(cls, version):
+        category_ids = defaultdict(list)
+        bits = {}
+        links = (Institution.category.through.objects.using(DEFAULT_DB_ALIAS).order_by('category_id')
+                 .values_list('institution_id', 'category_id'))
+        for institution_id, category_id in links:
+            category_ids[institution_id].append(category_id)
+            bits.setdefault(category_id, len(bits))
+
+        institutions = {}
+        for institution in Institution.objects.using(DEFAULT_DB_ALIAS).order_by('name').values('id', 'name', 'description', 'type'):
+            institution['category_ids'] = category_ids[institution['id']]
+            institutions[institution['id']] = institution
+        masks = {institution_id: category_mask(ids, bits) for institution_id, ids in category_ids.items()}
+        return cls(version, institutions, masks, bits)
+
+    def match(self, category_ids):
+        if not category_ids:
+            return [dict(institution, overlap=0) for institution in self.institutions.values()]
+        wanted = category_mask(category_ids, self.bits)
+
+        matches = []
+        for institution_id, mask in self.masks.items():
+            overlap = bin(mask & wanted).count('1')
+            if overlap:
+                matches.append(dict(self.institutions[institution_id], overlap=overlap))
+        return sorted(matches, key=lambda institution: (-institution['overlap'], institution['name']))
+
+
+def category_mask(category_ids, bits):
+    # Categories no institution is linked to have no bit and match nothing.
+    mask = 0
+    for category_id in category_ids:
+        if category_id in bits:
+            mask |= 1 << bits[category_id]
+    return mask
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_category_index():
+    global _index
+    version = current_version()
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = CategoryIndex.build(version)
+    return _index
+
+
+def invalidate_category_index():
+    cache.set(VERSION_KEY, time.time_ns(), None)
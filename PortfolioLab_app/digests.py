@@ -0,0 +1,71 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.template.loader import get_template
+
+from .models import Donation, PickupDigest
+
+DIGEST_DAYS = 7
+DIGEST_TEMPLATE = 'pickup_digest_email.html'
+
+
+def digest_rows(day, days=DIGEST_DAYS):
+    # Every institution's pickups come from this one grouped query, ordered
+    # so they can be split per institution without another round trip.
+    return (
+        Donation.objects.filter(is_taken=False, pick_up_date__range=(day, day + timedelta(days=days)))
+        .exclude(institution__email='')
+        .filter(~Exists(PickupDigest.objects.filter(institution=OuterRef('institution_id'), day=day)))
+        .values('institution_id', 'institution__name', 'institution__email', 'pick_up_date', 'city')
+        .annotate(donations=Count('id'), bags=Sum('quantity'))
+        .order_by('institution_id', 'pick_up_date', 'city')
+    )
+
+
+def build_digests(day, days=DIGEST_DAYS):
+    for institution_id, rows in groupby(digest_rows(day, days), key=lambda row: row['institution_id']):
+        rows = list(rows)
+        yield {
+            'institution_id': institution_id,
+            'name': rows[0]['institution__name'],
+            'email': rows[0]['institution__email'],
+            'pickups': rows,
+            'donations': sum(row['donations'] for row in rows),
+            'bags': sum(row['bags'] for row in rows),
+        }
+
+
+def digest_message(template, digest, day, days, connection):
+    body = template.render({'digest': digest, 'day': day, 'date_to': day + timedelta(days=days)})
+    return EmailMessage(f'Odbiory darów od {day}', body, to=[digest['email']], connection=connection)
+
+
+def send_digest(digest, template, day, days, connection):
+    # One digest per transaction: the row is written first, so a run racing
+    # on the same day fails on the unique constraint and skips it, and it is
+    # rolled back unless the message really went out.
+    try:
+        with transaction.atomic():
+            PickupDigest.objects.create(institution_id=digest['institution_id'], day=day,
+                                        donations=digest['donations'], bags=digest['bags'])
+            sent = connection.send_messages([digest_message(template, digest, day, days, connection)])
+            if not sent:
+                transaction.set_rollback(True)
+            return sent or 0
+    except IntegrityError:
+        return 0
+
+
+def send_pickup_digests(day, days=DIGEST_DAYS, connection=None):
+    # The connection stays open for the whole run; only the transactions are
+    # per message.
+    template = get_template(DIGEST_TEMPLATE)
+    connection = connection or get_connection()
+    sent = 0
+    with connection:
+        for digest in build_digests(day, days):
+            sent += send_digest(digest, template, day, days, connection)
+    return sent
@@ -0,0 +1,61 @@
+import csv
+import json
+
+from .models import Donation
+
+EXPORT_FIELDS = (
+    'id', 'quantity', 'institution', 'categories', 'address', 'phone_number', 'city', 'zip_code',
+    'pick_up_date', 'pick_up_time', 'pick_up_comment', 'user', 'is_taken', 'taken_timestamp',
+)
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    # iterator() streams through a server-side cursor where the database has
+    # one; categories are prefetched per chunk, so memory stays flat.
+    if queryset is None:
+        queryset = Donation.objects.all()
+    queryset = queryset.select_related('institution', 'user').prefetch_related('categories').order_by('pk')
+    for donation in queryset.iterator(chunk_size=chunk_size):
+        yield (
+            donation.pk,
+            donation.quantity,
+            donation.institution.name,
+            ', '.join(category.name for category in donation.categories.all()),
+            donation.address,
+            donation.phone_number,
+            donation.city,
+            donation.zip_code,
+            donation.pick_up_date.isoformat(),
+            donation.pick_up_time.isoformat(),
+            donation.pick_up_comment,
+            donation.user.username if donation.user else '',
+            donation.is_taken,
+            donation.taken_timestamp.isoformat(),
+        )
+
+
+def stream_csv(queryset=None, chunk_size=2000):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(queryset, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_jsonl(queryset=None, chunk_size=2000):
+    for row in export_rows(queryset, chunk_size):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + '\n'
+
+
+def stream_export(export_format, queryset=None, chunk_size=2000):
+    if export_format == 'jsonl':
+        return stream_jsonl(queryset, chunk_size)
+    return stream_csv(queryset, chunk_size)
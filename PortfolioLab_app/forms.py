@@ -4,7 +4,9 @@ from django.forms import TextInput, Select, SelectMultiple
 import re
 from django.contrib.auth.models import User
 
-from .models import Donation, Institution, Category
+from .backends import normalize_email, users_by_email
+from .models import TYPE, Donation, Institution, Category
+from .search import search_institutions
 
 
 class DonationForm(forms.ModelForm):
@@ -14,10 +16,113 @@ class DonationForm(forms.ModelForm):
                   'pick_up_date', 'pick_up_time', 'pick_up_comment', 'user', ]
 
 
+class NameListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return []
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, (list, tuple)):
+            raise ValidationError('Podaj listę nazw.')
+        return [str(name).strip() for name in value]
+
+
+class IdListField(NameListField):
+    def to_python(self, value):
+        try:
+            return [int(pk) for pk in super().to_python(value)]
+        except ValueError:
+            raise ValidationError('Podaj listę identyfikatorów.')
+
+
+class DonationIntakeForm(forms.Form):
+    institution = forms.CharField(max_length=64)
+    categories = NameListField(required=False)
+    quantity = forms.IntegerField(min_value=1)
+    address = forms.CharField(max_length=64)
+    phone_number = forms.IntegerField()
+    city = forms.CharField(max_length=64)
+    zip_code = forms.CharField(max_length=10)
+    pick_up_date = forms.DateField()
+    pick_up_time = forms.TimeField()
+    pick_up_comment = forms.CharField(required=False)
+
+
+class DonationFilterForm(forms.Form):
+    is_taken = forms.NullBooleanField(required=False, widget=forms.Select(choices=(
+        ('', 'Wszystkie'), ('0', 'Do odebrania'), ('1', 'Odebrane'))))
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    institution = forms.ModelChoiceField(queryset=Institution.objects.all(), required=False)
+    city = forms.CharField(max_length=64, required=False)
+
+    def filter(self, queryset):
+        data = self.cleaned_data
+        if data.get('is_taken') is not None:
+            queryset = queryset.filter(is_taken=data['is_taken'])
+        if data.get('date_from'):
+            queryset = queryset.filter(pick_up_date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(pick_up_date__lte=data['date_to'])
+        if data.get('institution'):
+            queryset = queryset.filter(institution=data['institution'])
+        if data.get('city'):
+            queryset = queryset.filter(city=data['city'])
+        return queryset
+
+
+class InstitutionSearchForm(forms.Form):
+    SORTS = {
+        'rank': ('-rank', 'name'),
+        'name': ('name',),
+        'type': ('type', '-rank', 'name'),
+    }
+
+    q = forms.CharField(max_length=100, required=False)
+    type = forms.TypedChoiceField(choices=(('', 'Wszystkie'), *TYPE), coerce=int, empty_value=None, required=False)
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by('name'), required=False,
+                                      empty_label='Wszystkie')
+    sort = forms.ChoiceField(choices=(('rank', 'Trafność'), ('name', 'Nazwa'), ('type', 'Rodzaj')), required=False)
+
+    def search(self, queryset=None):
+        data = self.cleaned_data
+        results = search_institutions(data['q'], queryset)
+        if data.get('type'):
+            results = results.filter(type=data['type'])
+        if data.get('category'):
+            results = results.filter(category=data['category'])
+        return results.order_by(*self.SORTS[data.get('sort') or 'rank'])
+
+
+class RollupFilterForm(forms.Form):
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    institution = forms.ModelChoiceField(queryset=Institution.objects.order_by('name'), required=False,
+                                         empty_label='Wszystkie')
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by('name'), required=False,
+                                      empty_label='Wszystkie')
+    group = forms.ChoiceField(choices=(('both', 'Instytucja i kategoria'), ('institution', 'Instytucja'),
+                                       ('category', 'Kategoria')), required=False)
+
+
+class DonationBulkTakeForm(forms.Form):
+    donation_ids = IdListField(required=False)
+    pick_up_date = forms.DateField(required=False)
+    city = forms.CharField(max_length=64, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('donation_ids') and not cleaned_data.get('pick_up_date'):
+            raise ValidationError('Zaznacz dary albo podaj datę odbioru.')
+        return cleaned_data
+
+
 class InstitutionForm(forms.ModelForm):
     class Meta:
         model = Institution
-        fields = ['name', 'description', 'type', 'category']
+        fields = ['name', 'description', 'type', 'category', 'email']
         widgets = {
             'name': TextInput(attrs={
                 'class': 'form-control',
@@ -32,6 +137,10 @@ class InstitutionForm(forms.ModelForm):
             }),
             'category': SelectMultiple(attrs={
                 'class': 'form-control',
+            }),
+            'email': forms.EmailInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Email do zestawień odbiorów'
             })
         }
 
@@ -77,9 +186,10 @@ class RegistrationForm(forms.ModelForm):
         password = cleaned_data.get('password')
         password_confirmation = cleaned_data.get('password_confirmation')
 
-        email = self.cleaned_data.get('username')
-        if User.objects.filter(username=email).exists():
+        email = normalize_email(self.cleaned_data.get('username') or '')
+        if users_by_email(email).exists():
             raise ValidationError('Ten email jest już używany.')
+        cleaned_data['username'] = email
 
         if len(password) < 8:
             raise ValidationError ("Hasło musi zawierać co najmniej 8 znaków")
@@ -130,6 +240,12 @@ class UserUpdateForm(forms.ModelForm):
             'last_name': 'Nazwiśko',
         }
 
+    def clean_username(self):
+        email = normalize_email(self.cleaned_data['username'])
+        if users_by_email(email).exclude(pk=self.instance.pk).exists():
+            raise ValidationError('Ten email jest już używany.')
+        return email
+
 
 class SearchUserForm(forms.Form):
     username = forms.CharField()
@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('PortfolioLab_app.performance')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+# Transaction control is not a query the view chose to make: whether atomic()
+# issues BEGIN or a SAVEPOINT depends on the surrounding transaction, so it is
+# left out of the count the budget is checked against.
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in Counter(sql for sql, _ in self.queries).values() if count > 1)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    # Connections are per thread, and async views run their queries in a
+    # sync_to_async thread, so the recorder lives on every connection and
+    # reports to whichever request owns the current context.
+    install_query_recorder(connection)
+
+
+def record_template_time(seconds):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.template_time += seconds
+
+
+class QueryInstrumentationMiddleware:
+    # Views may declare ``query_budget``; requests going over it are logged as
+    # warnings, so N+1 regressions show up in the logs.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def start(self):
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        return metrics, current_metrics.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        total_time = time.perf_counter() - start
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.2f};desc="{len(metrics.queries)} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.2f}',
+            f'total;dur={total_time * 1000:.2f}',
+        ])
+        self.log(request, response, metrics, total_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request.query_budget = getattr(view_class, 'query_budget', getattr(view_func, 'query_budget', None))
+
+    def log(self, request, response, metrics, total_time):
+        match = request.resolver_match
+        record = {
+            'url_name': match.url_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(metrics.queries),
+            'duplicate_queries': metrics.duplicate_queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'template_ms': round(metrics.template_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+        }
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and len(metrics.queries) > budget:
+            record['query_budget'] = budget
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
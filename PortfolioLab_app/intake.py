@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .forms import DonationIntakeForm
+from .models import ArchivedDonation, Category, Donation, Institution
+from .page_cache import invalidate_page_cache
+from .rollups import apply_rollup_deltas, donation_deltas, merge_deltas
+from .stats import update_donation_stats
+
+
+class IntakeResult:
+    def __init__(self, donations, errors):
+        self.donations = donations
+        self.errors = errors
+
+    def as_json(self):
+        return {
+            'created': [donation.pk for donation in self.donations],
+            'errors': [{'row': row, 'errors': errors.get_json_data()} for row, errors in self.errors.items()],
+        }
+
+
+def resolve_institutions(names):
+    return {institution.name: institution for institution in Institution.objects.filter(name__in=names)}
+
+
+def resolve_categories(names):
+    return dict(Category.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def create_donations(rows, user=None):
+    forms = [DonationIntakeForm(row) for row in rows]
+    valid_forms = [form for form in forms if form.is_valid()]
+    institutions = resolve_institutions({form.cleaned_data['institution'] for form in valid_forms})
+    categories = resolve_categories({name for form in valid_forms for name in form.cleaned_data['categories']})
+
+    donations = []
+    donation_categories = []
+    errors = {}
+    for row, form in enumerate(forms):
+        if form.is_valid():
+            data = form.cleaned_data
+            institution = institutions.get(data['institution'])
+            missing = [name for name in data['categories'] if name not in categories]
+            if institution is None:
+                form.add_error('institution', f'Nie znaleziono instytucji: {data["institution"]}')
+            if missing:
+                form.add_error('categories', f'Nie znaleziono kategorii: {", ".join(missing)}')
+        if form.errors:
+            errors[row] = form.errors
+            continue
+
+        donations.append(Donation(
+            quantity=data['quantity'], institution=institution, address=data['address'],
+            phone_number=data['phone_number'], city=data['city'], zip_code=data['zip_code'],
+            pick_up_date=data['pick_up_date'], pick_up_time=data['pick_up_time'],
+            pick_up_comment=data['pick_up_comment'], user=user,
+        ))
+        donation_categories.append({categories[name] for name in data['categories']})
+
+    if donations:
+        _insert_donations(donations, donation_categories)
+    return IntakeResult(donations, errors)
+
+
+def _insert_donations(donations, donation_categories):
+    # bulk_create skips the save signals, so the stats, rollups and page
+    # cache are updated here for the whole batch.
+    Link = Donation.categories.through
+    institution_ids = {donation.institution_id for donation in donations}
+    with transaction.atomic():
+        supported_before = set(Institution.objects.filter(pk__in=institution_ids).filter(
+            Exists(Donation.objects.filter(institution=OuterRef('pk')))
+            | Exists(ArchivedDonation.objects.filter(institution=OuterRef('pk')))
+        ).values_list('pk', flat=True))
+        Donation.objects.bulk_create(donations)
+        Link.objects.bulk_create([
+            Link(donation_id=donation.pk, category_id=category_id)
+            for donation, category_ids in zip(donations, donation_categories)
+            for category_id in category_ids
+        ])
+        update_donation_stats(
+            total_quantity=sum(donation.quantity for donation in donations),
+            donation_count=len(donations),
+            supported_institutions=len(institution_ids - supported_before),
+        )
+        apply_rollup_deltas(merge_deltas(
+            donation_deltas(donation.pick_up_date, donation.institution_id, category_ids, int(donation.quantity),
+                            donation.is_taken)
+            for donation, category_ids in zip(donations, donation_categories)
+        ))
+        transaction.on_commit(invalidate_page_cache)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from PortfolioLab_app.archive import archivable_donations, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Przenosi odebrane dary starsze niż --days dni (razem z kategoriami) do archiwum, '
+            'partiami w osobnych transakcjach. Przerwane przenoszenie można po prostu uruchomić ponownie.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.DONATION_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, help='Zatrzymaj się po tylu partiach')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Przerwa między partiami w sekundach')
+        parser.add_argument('--dry-run', action='store_true', help='Tylko policz dary do przeniesienia')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'Do archiwum (odbiór przed {cutoff}): {archivable_donations(cutoff).count()}')
+            return
+
+        batches = total = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            batches += 1
+            total += moved
+            self.stdout.write(f'Partia {batches}: {moved} darów')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Przeniesiono do archiwum {total} darów odebranych przed {cutoff}'))
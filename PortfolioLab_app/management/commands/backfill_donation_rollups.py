@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PortfolioLab_app.rollups import donation_date_range, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Przelicza tabelę DonationRollup z historii darów, po kilka dni na transakcję. '
+            'Każdy zakres jest liczony od nowa, więc przerwane przeliczanie można wznowić od --since.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='RRRR-MM-DD, domyślnie pierwszy dar')
+        parser.add_argument('--until', type=date.fromisoformat, help='RRRR-MM-DD, domyślnie ostatni dar')
+        parser.add_argument('--days', type=int, default=31, help='Liczba dni w jednej partii')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days musi być dodatnie')
+        first, last = donation_date_range()
+        since, until = options['since'] or first, options['until'] or last
+        if since is None or until is None:
+            self.stdout.write('Brak darów do przeliczenia')
+            return
+
+        start, total = since, 0
+        while start <= until:
+            end = min(start + timedelta(days=options['days'] - 1), until)
+            count = rebuild_rollups(start, end)
+            total += count
+            self.stdout.write(f'{start} – {end}: {count} wierszy')
+            start = end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Gotowe, {total} wierszy od {since} do {until}'))
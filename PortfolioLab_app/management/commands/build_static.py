@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from PortfolioLab_app.static_assets import brotli, compression_report
+
+
+def saving(original, compressed):
+    if compressed is None or not original:
+        return '-'
+    return f'{compressed:>9} B ({(original - compressed) / original:>4.0%})'
+
+
+class Command(BaseCommand):
+    help = ('Uruchamia collectstatic (nazwy z hashem treści, manifest, warianty .br/.gz) '
+            'i wypisuje oszczędność bajtów dla każdego pliku.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report-only', action='store_true', help='Tylko raport z poprzedniego budowania')
+        parser.add_argument('--clear', action='store_true', help='Usuń poprzednie pliki z STATIC_ROOT')
+
+    def handle(self, *args, **options):
+        if not options['report_only']:
+            call_command('collectstatic', interactive=False, clear=options['clear'], verbosity=options['verbosity'])
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('Pakiet brotli nie jest zainstalowany, pomijam pliki .br'))
+
+        rows = compression_report()
+        totals = {'bytes': 0, 'gzip': 0, 'br': 0}
+        self.stdout.write(f'{"plik":<48} {"oryginał":>11} {"gzip":>17} {"brotli":>17}')
+        for row in rows:
+            self.stdout.write(f'{row["name"]:<48} {row["bytes"]:>9} B {saving(row["bytes"], row["gzip"]):>17} '
+                              f'{saving(row["bytes"], row.get("br")):>17}')
+            totals['bytes'] += row['bytes']
+            for encoding in ('gzip', 'br'):
+                # Files without a variant are sent as they are.
+                totals[encoding] += row[encoding] if row.get(encoding) is not None else row['bytes']
+        self.stdout.write(f'{"razem":<48} {totals["bytes"]:>9} B {saving(totals["bytes"], totals["gzip"]):>17} '
+                          f'{saving(totals["bytes"], totals["br"] if brotli else None):>17}')
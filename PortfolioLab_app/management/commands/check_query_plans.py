@@ -0,0 +1,40 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PortfolioLab_app.query_plans import sequential_scans, view_querysets
+from PortfolioLab_app.seed import seeded_test_database
+
+
+class Command(BaseCommand):
+    help = ('Uruchamia EXPLAIN dla zapytań widoków na zasilonej testowej bazie i kończy się błędem, '
+            'jeśli któreś z nich skanuje sekwencyjnie dużą tabelę.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institutions', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--donations', type=int, default=100000)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Sprawdza plany na skonfigurowanej bazie, bez tworzenia testowej')
+
+    def handle(self, *args, **options):
+        counts = {key: options[key] for key in ('institutions', 'categories', 'users', 'donations')}
+        database = nullcontext() if options['no_seed'] else seeded_test_database(**counts)
+
+        failures = []
+        with database:
+            for label, queryset in view_querysets():
+                plan = queryset.explain()
+                scans = sequential_scans(plan)
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'{label}: skan sekwencyjny {", ".join(scans)}'))
+                    self.stdout.write(plan)
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{label}:\n{plan}')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{label}: OK'))
+
+        if failures:
+            raise CommandError(f'Skan sekwencyjny w {len(failures)} zapytaniach: {", ".join(failures)}')
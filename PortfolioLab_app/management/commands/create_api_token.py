@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from PortfolioLab_app.api_auth import AUTH_SCHEME, create_api_token
+from PortfolioLab_app.backends import users_by_email
+
+
+class Command(BaseCommand):
+    help = ('Tworzy token API dla punktu zbiórki, który wysyła dary do /api/donations/bulk/. '
+            'Klucz jest wyświetlany tylko raz; odwołanie to usunięcie tokenu w panelu admina.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Użytkownik, na którego konto zapisywane są dary')
+        parser.add_argument('--name', required=True, help='Nazwa punktu zbiórki')
+
+    def handle(self, *args, **options):
+        try:
+            user = users_by_email(options['username']).get()
+        except User.DoesNotExist:
+            raise CommandError(f'Nie znaleziono użytkownika: {options["username"]}')
+        key = create_api_token(user, options['name'])
+        self.stdout.write(f'Authorization: {AUTH_SCHEME} {key}')
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from PortfolioLab_app.exports import EXPORT_FORMATS, stream_export
+from PortfolioLab_app.forms import DonationFilterForm
+from PortfolioLab_app.archive import donation_model
+from PortfolioLab_app.routers import use_replica
+
+
+class Command(BaseCommand):
+    help = 'Eksportuje dary do CSV lub JSON Lines, strumieniowo i partiami.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help='Plik wynikowy, domyślnie standardowe wyjście')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--is-taken', choices=('0', '1'))
+        parser.add_argument('--date-from', help='RRRR-MM-DD')
+        parser.add_argument('--date-to', help='RRRR-MM-DD')
+        parser.add_argument('--institution', type=int, help='Id instytucji')
+        parser.add_argument('--city')
+        parser.add_argument('--history', action='store_true', help='Eksportuj dary z archiwum')
+
+    def handle(self, *args, **options):
+        form = DonationFilterForm({
+            key: options[key] for key in ('is_taken', 'date_from', 'date_to', 'institution', 'city')
+            if options[key] is not None
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        donations = form.filter(donation_model(options['history']).objects.all())
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            with use_replica():
+                for chunk in stream_export(options['format'], donations, options['chunk_size']):
+                    output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
@@ -0,0 +1,47 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from PortfolioLab_app import template_profiler
+
+
+class Command(BaseCommand):
+    help = ('Renderuje podane strony z włączonym profilerem szablonów i wypisuje czas oraz liczbę '
+            'zapytań dla każdego szablonu, bloku i pętli {% for %}.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/', '/all_donation/', '/donation/'])
+        parser.add_argument('--user', help='Nazwa użytkownika, jako który pobierać strony')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--limit', type=int, default=30, help='Liczba wierszy w tabeli')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            try:
+                client.force_login(User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Nie ma użytkownika {options["user"]}')
+
+        template_profiler.install()
+        template_profiler.reset()
+        # The page cache would answer repeats without rendering anything.
+        with override_settings(PAGE_CACHE_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+            for path in options['paths']:
+                for _ in range(options['repeat']):
+                    response = client.get(path)
+                    if response.status_code != 200:
+                        self.stderr.write(f'{path}: {response.status_code}')
+                        break
+
+        rows = template_profiler.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2, ensure_ascii=False))
+            return
+        self.stdout.write(f'{"szablon":<24} {"fragment":<56} {"wyw.":>5} {"razem ms":>9} {"śr. ms":>8} {"zap.":>5}')
+        for row in rows[:options['limit']]:
+            self.stdout.write(f'{row["template"]:<24} {row["node"][:56]:<56} {row["calls"]:>5} '
+                              f'{row["total_ms"]:>9} {row["avg_ms"]:>8} {row["queries"]:>5}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from PortfolioLab_app.stats import rebuild_donation_stats
+
+
+class Command(BaseCommand):
+    help = 'Przelicza od nowa statystyki darów wyświetlane na stronie głównej.'
+
+    def handle(self, *args, **options):
+        stats = rebuild_donation_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worki: {stats.total_quantity}, dary: {stats.donation_count}, '
+            f'wsparte instytucje: {stats.supported_institutions}, instytucje: {stats.institution_count}'
+        ))
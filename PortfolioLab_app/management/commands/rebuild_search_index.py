@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from PortfolioLab_app.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = ('Przelicza indeks wyszukiwania instytucji, np. po imporcie przez bulk_create '
+            'albo po zainstalowaniu polskiego słownika w PostgreSQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Indeks wyszukiwania przebudowany'))
@@ -0,0 +1,113 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from PortfolioLab_app.benchmark import benchmark_endpoint, benchmark_endpoint_asgi, compare, default_endpoints
+from PortfolioLab_app.seed import seeded_test_database
+
+
+INTERFACES = {
+    'wsgi': benchmark_endpoint,
+    'asgi': benchmark_endpoint_asgi,
+}
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Zasila testową bazę, obciąża główne widoki równoległymi żądaniami i zapisuje '
+            'opóźnienia p50/p95/p99, żądania na sekundę i zapytania na żądanie do pliku JSON. '
+            'SQLite blokuje równoległe zapisy, więc żądania POST idą tam po jednym; mierz je na PostgreSQL. '
+            'Kończy się błędem, jeśli któryś widok odpowiedział błędem.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institutions', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--donations', type=int, default=20000)
+        parser.add_argument('--requests', type=int, default=200, help='Liczba żądań na widok')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--only', nargs='*', help='Nazwy widoków do zmierzenia')
+        parser.add_argument('--interface', choices=[*INTERFACES, 'both'], default='wsgi',
+                            help='Obsługa żądań: WSGI (wątki), ASGI (asynchroniczne widoki) lub oba')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', help='Poprzedni plik wyników do porównania')
+
+    def handle(self, *args, **options):
+        dataset = {key: options[key] for key in ('institutions', 'categories', 'users', 'donations')}
+        interfaces = list(INTERFACES) if options['interface'] == 'both' else [options['interface']]
+        results = {interface: {} for interface in interfaces}
+
+        setup_test_environment()
+        try:
+            # One client IP sends every request, so throttling would turn the
+            # login benchmark into a benchmark of 429 responses.
+            with seeded_test_database(**dataset), override_settings(THROTTLE_RULES={}):
+                for endpoint in default_endpoints():
+                    if options['only'] and endpoint.name not in options['only']:
+                        continue
+                    concurrency = options['concurrency']
+                    if connection.vendor == 'sqlite' and endpoint.method == 'POST':
+                        concurrency = 1
+                    for interface in interfaces:
+                        result = INTERFACES[interface](endpoint, options['requests'], concurrency)
+                        results[interface][endpoint.name] = result
+                        self.stdout.write(
+                            f'{interface} {endpoint.name:<28} p50 {result["p50_ms"]:>8} ms  '
+                            f'p95 {result["p95_ms"]:>8} ms  p99 {result["p99_ms"]:>8} ms  '
+                            f'{result["requests_per_second"]:>8} req/s  '
+                            f'{result["queries_per_request"]:>6} q/req  błędy {result["errors"]}'
+                        )
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Zapisano wyniki do {options["output"]}'))
+
+        if len(interfaces) > 1:
+            self.stdout.write('ASGI względem WSGI (%):')
+            self.write_changes(compare(results['asgi'], results['wsgi']))
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                previous_report = json.load(previous)
+            previous_results = previous_report['results']
+            if 'wsgi' not in previous_results and 'asgi' not in previous_results:
+                # Reports from before --interface only measured WSGI.
+                previous_results = {'wsgi': previous_results}
+            self.stdout.write(f'Zmiana względem {previous_report.get("commit")} (%):')
+            for interface in interfaces:
+                self.write_changes(compare(results[interface], previous_results.get(interface, {})), interface)
+
+        # Error responses are fast and cheap, so a failing view would look like
+        # an improvement in the numbers above.
+        failing = [f'{interface} {name}' for interface, rows in results.items()
+                   for name, result in rows.items() if result['errors']]
+        if failing:
+            raise CommandError(f'Błędy odpowiedzi w {len(failing)} pomiarach: {", ".join(failing)}')
+
+    def write_changes(self, rows, prefix=''):
+        for name, changes in rows:
+            self.stdout.write(f'{prefix:<5}{name:<28} ' + '  '.join(
+                f'{key} {value:+}' for key, value in changes.items() if value is not None))
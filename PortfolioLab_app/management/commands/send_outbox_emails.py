@@ -0,0 +1,32 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from PortfolioLab_app.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Wysyła oczekujące emaile z kolejki, używając jednego połączenia na partię.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backend', help='Nadpisuje EMAIL_BACKEND, np. django.core.mail.backends.console.EmailBackend')
+        parser.add_argument('--loop', action='store_true', help='Działa w pętli, zamiast zakończyć po opróżnieniu kolejki')
+        parser.add_argument('--interval', type=float, default=5, help='Przerwa między sprawdzeniami kolejki w trybie --loop')
+
+    def handle(self, *args, **options):
+        connection = get_connection(options['backend'])
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox(options['batch_size'], options['max_attempts'], connection)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Wysłano: {total_sent}, nieudane próby: {total_failed}'))
@@ -0,0 +1,31 @@
+from datetime import date
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from PortfolioLab_app.digests import DIGEST_DAYS, build_digests, send_pickup_digests
+
+
+class Command(BaseCommand):
+    help = ('Wysyła instytucjom dzienne zestawienie nadchodzących odbiorów darów. '
+            'Każda instytucja dostaje najwyżej jedno zestawienie dziennie, więc komendę można uruchamiać ponownie.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Dzień zestawienia RRRR-MM-DD, domyślnie dziś')
+        parser.add_argument('--days', type=int, default=DIGEST_DAYS, help='Ile dni naprzód obejmuje zestawienie')
+        parser.add_argument('--backend', help='Nadpisuje EMAIL_BACKEND, np. django.core.mail.backends.console.EmailBackend')
+        parser.add_argument('--dry-run', action='store_true', help='Tylko policz zestawienia do wysłania')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError(f'Nieprawidłowa data: {options["date"]}')
+
+        if options['dry_run']:
+            count = sum(1 for _ in build_digests(day, options['days']))
+            self.stdout.write(f'Zestawień do wysłania: {count}')
+            return
+
+        sent = send_pickup_digests(day, options['days'], get_connection(options['backend']))
+        self.stdout.write(self.style.SUCCESS(f'Wysłano zestawień: {sent}'))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0008_alter_donation_user_delete_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_quantity', models.PositiveIntegerField(default=0)),
+                ('donation_count', models.PositiveIntegerField(default=0)),
+                ('supported_institutions', models.PositiveIntegerField(default=0)),
+                ('institution_count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'donation stats',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:42
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_names(apps, schema_editor):
+    duplicates = []
+    for model_name in ('Category', 'Institution'):
+        model = apps.get_model('PortfolioLab_app', model_name)
+        names = (model.objects.values_list('name', flat=True).annotate(total=Count('id'))
+                 .filter(total__gt=1).order_by('name'))
+        duplicates += [f'{model_name}: {name}' for name in names]
+    if duplicates:
+        raise RuntimeError('Zduplikowane nazwy, popraw je przed migracją:\n' + '\n'.join(duplicates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0010_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='institution',
+            name='name',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['pick_up_date', 'id'], name='donation_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['is_taken', 'pick_up_date', 'id'], name='donation_taken_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['user', 'is_taken', 'pick_up_date', 'id'], name='donation_user_taken_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institution',
+            index=models.Index(fields=['type', 'name'], name='institution_type_name_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0011_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['is_taken', 'pick_up_date', 'zip_code'], name='donation_pickup_plan_idx'),
+        ),
+    ]
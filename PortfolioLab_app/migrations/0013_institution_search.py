@@ -0,0 +1,45 @@
+# Generated by Django 4.2.4 on 2026-10-18 16:05
+
+from django.db import migrations
+
+INSTITUTION_TABLE = 'PortfolioLab_app_institution'
+FTS_TABLE = 'PortfolioLab_app_institution_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = 'polish'")
+            config = 'polish' if cursor.fetchone() else 'simple'
+            cursor.execute(f'ALTER TABLE "{INSTITUTION_TABLE}" ADD COLUMN search_vector tsvector')
+            cursor.execute(f'CREATE INDEX institution_search_idx ON "{INSTITUTION_TABLE}" USING GIN (search_vector)')
+            cursor.execute(
+                f'UPDATE "{INSTITUTION_TABLE}" SET search_vector = '
+                f"setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, coalesce(description, '')), 'B')", [config, config])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5('
+                           f"name, description, tokenize = 'unicode61 remove_diacritics 2')")
+            cursor.execute(f'INSERT INTO "{FTS_TABLE}" (rowid, name, description) '
+                           f'SELECT id, name, description FROM "{INSTITUTION_TABLE}"')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'ALTER TABLE "{INSTITUTION_TABLE}" DROP COLUMN search_vector')
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE "{FTS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0012_donation_pickup_plan_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
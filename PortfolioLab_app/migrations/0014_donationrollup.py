@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0013_institution_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('donations', models.IntegerField(default=0)),
+                ('bags', models.IntegerField(default=0)),
+                ('taken_donations', models.IntegerField(default=0)),
+                ('taken_bags', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='PortfolioLab_app.category')),
+                ('institution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='PortfolioLab_app.institution')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='donationrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'institution', 'category'), name='donation_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.4 on 2026-10-18 17:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('PortfolioLab_app', '0014_donationrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDonation',
+            fields=[
+                ('quantity', models.IntegerField()),
+                ('address', models.CharField(max_length=64)),
+                ('phone_number', models.IntegerField()),
+                ('city', models.CharField(max_length=64)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('pick_up_date', models.DateField()),
+                ('pick_up_time', models.TimeField()),
+                ('pick_up_comment', models.TextField()),
+                ('is_taken', models.BooleanField(default=False)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('taken_timestamp', models.DateTimeField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('categories', models.ManyToManyField(to='PortfolioLab_app.category')),
+                ('institution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='PortfolioLab_app.institution')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archiveddonation',
+            index=models.Index(fields=['pick_up_date', 'id'], name='archived_donation_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveddonation',
+            index=models.Index(fields=['user', 'pick_up_date', 'id'], name='archived_donation_user_idx'),
+        ),
+    ]
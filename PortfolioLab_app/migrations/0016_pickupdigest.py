@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0015_archiveddonation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institution',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254),
+        ),
+        migrations.CreateModel(
+            name='PickupDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('donations', models.PositiveIntegerField(default=0)),
+                ('bags', models.PositiveIntegerField(default=0)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('institution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='PortfolioLab_app.institution')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pickupdigest',
+            constraint=models.UniqueConstraint(fields=('institution', 'day'), name='pickup_digest_key'),
+        ),
+    ]
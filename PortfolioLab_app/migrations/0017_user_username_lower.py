@@ -0,0 +1,46 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:45
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+INDEX_NAME = 'auth_user_username_lower_key'
+
+
+def email_collisions(User):
+    return list(
+        User.objects.annotate(username_lower=Lower('username'))
+        .values('username_lower').annotate(accounts=Count('id')).filter(accounts__gt=1)
+        .order_by('username_lower').values_list('username_lower', flat=True)
+    )
+
+
+def create_username_lower_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    collisions = email_collisions(User)
+    if collisions:
+        report = '\n'.join(
+            f'  {email}: ' + ', '.join(f'{user.pk} ({user.username})' for user in
+                                      User.objects.filter(username__iexact=email).order_by('pk'))
+            for email in collisions
+        )
+        raise RuntimeError(f'Konta różniące się tylko wielkością liter w emailu ({len(collisions)}). '
+                           f'Scal je lub zmień ich email i uruchom migrację ponownie:\n{report}')
+    table = schema_editor.quote_name(User._meta.db_table)
+    schema_editor.execute(f'CREATE UNIQUE INDEX {INDEX_NAME} ON {table} (LOWER(username))')
+
+
+def drop_username_lower_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('PortfolioLab_app', '0016_pickupdigest'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_username_lower_index, drop_username_lower_index),
+    ]
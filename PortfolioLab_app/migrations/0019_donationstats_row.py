@@ -0,0 +1,36 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:05
+
+from django.db import migrations
+from django.db.models import Count, Exists, OuterRef, Sum
+
+
+def create_stats_row(apps, schema_editor):
+    # The home page reads this row on every request; creating it here keeps
+    # the first visitor from paying for the rebuild in get_donation_stats().
+    db_alias = schema_editor.connection.alias
+    Donation = apps.get_model('PortfolioLab_app', 'Donation')
+    ArchivedDonation = apps.get_model('PortfolioLab_app', 'ArchivedDonation')
+    Institution = apps.get_model('PortfolioLab_app', 'Institution')
+    DonationStats = apps.get_model('PortfolioLab_app', 'DonationStats')
+    totals = [model.objects.using(db_alias).aggregate(total_quantity=Sum('quantity'), donation_count=Count('id'))
+              for model in (Donation, ArchivedDonation)]
+    DonationStats.objects.using(db_alias).update_or_create(pk=1, defaults={
+        'total_quantity': sum(total['total_quantity'] or 0 for total in totals),
+        'donation_count': sum(total['donation_count'] for total in totals),
+        'supported_institutions': Institution.objects.using(db_alias).filter(
+            Exists(Donation.objects.filter(institution=OuterRef('pk')))
+            | Exists(ArchivedDonation.objects.filter(institution=OuterRef('pk')))
+        ).count(),
+        'institution_count': Institution.objects.using(db_alias).count(),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PortfolioLab_app', '0018_apitoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_stats_row, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 
@@ -12,16 +13,20 @@ TYPE = (
 
 
 class Category(models.Model):
-    name = models.CharField(max_length=64)
+    name = models.CharField(max_length=64, unique=True)
 
     def __str__(self):
         return self.name
 
 class Institution(models.Model):
-    name = models.CharField(max_length=64)
+    name = models.CharField(max_length=64, unique=True)
     description = models.TextField()
     type = models.IntegerField(choices=TYPE, default=1)
     category = models.ManyToManyField(Category)
+    email = models.EmailField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['type', 'name'], name='institution_type_name_idx')]
 
     def __str__(self):
         return self.name
@@ -30,7 +35,7 @@ class Institution(models.Model):
     def type_name(self):
         return TYPE[self.type - 1][1]
 
-class Donation(models.Model):
+class DonationBase(models.Model):
     quantity = models.IntegerField()
     categories = models.ManyToManyField(Category)
     institution = models.ForeignKey(Institution, on_delete=models.CASCADE)
@@ -45,5 +50,118 @@ class Donation(models.Model):
     is_taken = models.BooleanField(default=False)
     taken_timestamp = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        abstract = True
+
+
+class Donation(DonationBase):
+    class Meta:
+        indexes = [
+            models.Index(fields=['pick_up_date', 'id'], name='donation_date_idx'),
+            models.Index(fields=['is_taken', 'pick_up_date', 'id'], name='donation_taken_date_idx'),
+            models.Index(fields=['user', 'is_taken', 'pick_up_date', 'id'], name='donation_user_taken_date_idx'),
+            models.Index(fields=['is_taken', 'pick_up_date', 'zip_code'], name='donation_pickup_plan_idx'),
+        ]
+
+
+class ArchivedDonation(DonationBase):
+    # Taken donations moved out of the hot table by archive_donations; ids
+    # are kept, so links and exports stay stable.
+    id = models.BigIntegerField(primary_key=True)
+    taken_timestamp = models.DateTimeField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pick_up_date', 'id'], name='archived_donation_date_idx'),
+            models.Index(fields=['user', 'pick_up_date', 'id'], name='archived_donation_user_idx'),
+        ]
+
+
+class DonationRollup(models.Model):
+    # Totals per (pick-up day, institution, category) for the analytics
+    # dashboard. A donation counts once under each of its categories.
+    day = models.DateField()
+    institution = models.ForeignKey(Institution, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    donations = models.IntegerField(default=0)
+    bags = models.IntegerField(default=0)
+    taken_donations = models.IntegerField(default=0)
+    taken_bags = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'institution', 'category'], name='donation_rollup_key'),
+        ]
+
+
+class DonationStats(models.Model):
+    total_quantity = models.PositiveIntegerField(default=0)
+    donation_count = models.PositiveIntegerField(default=0)
+    supported_institutions = models.PositiveIntegerField(default=0)
+    institution_count = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'donation stats'
+
+    def __str__(self):
+        return f'{self.total_quantity} worków, {self.donation_count} darów'
+
+
+class OutboxEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS = (
+        (PENDING, 'oczekuje'),
+        (SENT, 'wysłany'),
+        (FAILED, 'błąd'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
+
 
+class PickupDigest(models.Model):
+    # One row per institution and day the pickup digest went out, so a
+    # second run on the same day skips it.
+    institution = models.ForeignKey(Institution, on_delete=models.CASCADE)
+    day = models.DateField()
+    donations = models.PositiveIntegerField(default=0)
+    bags = models.PositiveIntegerField(default=0)
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['institution', 'day'], name='pickup_digest_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.institution} {self.day}'
 
+
+class ApiToken(models.Model):
+    # Lets partner collection points post to the intake API without a session.
+    # Only the SHA-256 of the key is stored; the key is shown once on creation.
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=64)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.user})'
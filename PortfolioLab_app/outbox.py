@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+RETRY_BACKOFF = 60
+MAX_BACKOFF = 60 * 60
+
+
+def queue_email(subject, body, recipient):
+    return OutboxEmail.objects.create(subject=subject, body=body, recipient=recipient)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = repr(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.FAILED
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+
+def deliver_outbox(batch_size=100, max_attempts=5, connection=None):
+    # Rows stay locked until the batch is recorded, so two workers never send
+    # the same email; skip_locked lets the second worker take the next batch.
+    now = timezone.now()
+    sent = failed = 0
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = connection or get_connection()
+        delivered = 0
+        try:
+            with connection:
+                for email in batch:
+                    message = EmailMessage(email.subject, email.body, to=[email.recipient], connection=connection)
+                    try:
+                        connection.send_messages([message])
+                    except Exception as error:
+                        failed += 1
+                        record_failure(email, error, max_attempts)
+                    else:
+                        sent += 1
+                        email.attempts += 1
+                        email.status = OutboxEmail.SENT
+                        email.sent_at = timezone.now()
+                    delivered += 1
+        except Exception as error:
+            # Opening the connection (connect, STARTTLS, login) failed, so the
+            # rest of the claimed batch is rescheduled like any failed send.
+            for email in batch[delivered:]:
+                failed += 1
+                record_failure(email, error, max_attempts)
+
+        OutboxEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'page_cache:generation'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def _ageneration():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, time.time_ns(), None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def _keys(request, generation):
+    page_key = f'{request.path}:{request.GET.get("page", "")}'
+    return f'page_cache:{generation}:{page_key}', f'page_cache:stale:{page_key}', f'page_cache:lock:{page_key}'
+
+
+def invalidate_page_cache():
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and set(request.GET) <= {'page'}
+    )
+
+
+def is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def cache_anonymous_page(view):
+    # Purging bumps the generation, so old entries are simply never read again.
+    # The latest response is also kept under a generation-less key: while one
+    # worker re-renders a purged page, the others serve that stale copy.
+    if iscoroutinefunction(view):
+        return _acache_anonymous_page(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _setting('PAGE_CACHE_ENABLED', True) or not is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key, stale_key, lock_key = _keys(request, _generation())
+        response = cache.get(key)
+        if response is not None:
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        if not cache.add(lock_key, 1, _setting('PAGE_CACHE_LOCK_TIMEOUT', 10)):
+            response = cache.get(stale_key) or _wait_for(key)
+            if response is not None:
+                response['X-Page-Cache'] = 'stale'
+                return response
+            return view(request, *args, **kwargs)
+
+        try:
+            response = _store(request, view(request, *args, **kwargs), key, stale_key)
+        finally:
+            cache.delete(lock_key)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    return wrapper
+
+
+def _acache_anonymous_page(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not _setting('PAGE_CACHE_ENABLED', True) or not is_cacheable_request(request):
+            return await view(request, *args, **kwargs)
+
+        key, stale_key, lock_key = _keys(request, await _ageneration())
+        response = await cache.aget(key)
+        if response is not None:
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        if not await cache.aadd(lock_key, 1, _setting('PAGE_CACHE_LOCK_TIMEOUT', 10)):
+            response = await cache.aget(stale_key) or await _await_for(key)
+            if response is not None:
+                response['X-Page-Cache'] = 'stale'
+                return response
+            return await view(request, *args, **kwargs)
+
+        try:
+            response = await view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            if is_cacheable_response(request, response):
+                await cache.aset(key, response, _setting('PAGE_CACHE_TIMEOUT', 60 * 5))
+                await cache.aset(stale_key, response, _setting('PAGE_CACHE_STALE_TIMEOUT', 60 * 60))
+        finally:
+            await cache.adelete(lock_key)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    return wrapper
+
+
+def _store(request, response, key, stale_key):
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    if is_cacheable_response(request, response):
+        cache.set(key, response, _setting('PAGE_CACHE_TIMEOUT', 60 * 5))
+        cache.set(stale_key, response, _setting('PAGE_CACHE_STALE_TIMEOUT', 60 * 60))
+    return response
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + _setting('PAGE_CACHE_LOCK_WAIT', 2)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = cache.get(key)
+        if response is not None:
+            return response
+    return None
+
+
+async def _await_for(key):
+    deadline = time.monotonic() + _setting('PAGE_CACHE_LOCK_WAIT', 2)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        response = await cache.aget(key)
+        if response is not None:
+            return response
+    return None
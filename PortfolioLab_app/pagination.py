@@ -0,0 +1,116 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough.
+EXACT_COUNT_LIMIT = 10000
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def encode_cursor(direction, obj, date_field):
+    raw = f'{direction}:{getattr(obj, date_field).isoformat()}:{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        direction, key_date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if direction not in ('next', 'previous'):
+            raise ValueError(direction)
+        return direction, date.fromisoformat(key_date), int(pk)
+    except (AttributeError, ValueError, UnicodeDecodeError, binascii.Error):
+        return None, None, None
+
+
+def keyset_queryset(queryset, cursor, date_field='pick_up_date'):
+    # Pages are cut on the (date, id) key instead of OFFSET, so page 10 000
+    # reads exactly as many rows as page 1.
+    direction, key_date, pk = decode_cursor(cursor)
+    if direction == 'next':
+        return direction, queryset.filter(
+            Q(**{f'{date_field}__gt': key_date}) | Q(**{date_field: key_date, 'pk__gt': pk})
+        ).order_by(date_field, 'pk')
+    if direction == 'previous':
+        return direction, queryset.filter(
+            Q(**{f'{date_field}__lt': key_date}) | Q(**{date_field: key_date, 'pk__lt': pk})
+        ).order_by(f'-{date_field}', '-pk')
+    return direction, queryset.order_by(date_field, 'pk')
+
+
+def keyset_paginate(queryset, cursor, per_page, date_field='pick_up_date'):
+    direction, queryset = keyset_queryset(queryset, cursor, date_field)
+    return keyset_page(list(queryset[:per_page + 1]), direction, per_page, date_field)
+
+
+async def akeyset_paginate(queryset, cursor, per_page, date_field='pick_up_date'):
+    direction, queryset = keyset_queryset(queryset, cursor, date_field)
+    return keyset_page([row async for row in queryset[:per_page + 1]], direction, per_page, date_field)
+
+
+def keyset_page(rows, direction, per_page, date_field='pick_up_date'):
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'previous':
+        rows.reverse()
+
+    has_next = has_more if direction != 'previous' else True
+    has_previous = direction == 'next' or (direction == 'previous' and has_more)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor('next', rows[-1], date_field) if rows and has_next else None,
+        previous_cursor=encode_cursor('previous', rows[0], date_field) if rows and has_previous else None,
+    )
+
+
+def estimated_count(queryset):
+    """The planner's row estimate on PostgreSQL, None where there is none."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                           [connection.ops.quote_name(queryset.model._meta.db_table)])
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed or analyzed.
+        return int(row[0]) if row and row[0] >= 0 else None
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    # Large changelists show "about N" pages instead of scanning the whole
+    # table for COUNT(*); small results still get an exact count.
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list) if hasattr(self.object_list, 'query') else None
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
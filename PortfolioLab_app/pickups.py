@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, Substr
+from django.utils import timezone
+
+from .models import Donation
+from .rollups import record_taken
+
+ZIP_PREFIX_LENGTH = 2
+
+
+def mark_donations_taken(queryset):
+    # update() skips the save signals, so the rollups are moved here for the
+    # rows this call actually flips.
+    with transaction.atomic():
+        donation_ids = list(queryset.filter(is_taken=False).select_for_update().values_list('pk', flat=True))
+        updated = Donation.objects.filter(pk__in=donation_ids, is_taken=False).update(
+            is_taken=True, taken_timestamp=timezone.now())
+        record_taken(donation_ids)
+        return updated
+
+
+def donations_to_take(donation_ids=None, pick_up_date=None, city=None):
+    if donation_ids:
+        return Donation.objects.filter(pk__in=donation_ids)
+    donations = Donation.objects.filter(pick_up_date=pick_up_date)
+    if city:
+        donations = donations.filter(city=city)
+    return donations
+
+
+def pickup_windows(pick_up_date, zip_prefix_length=ZIP_PREFIX_LENGTH):
+    return (
+        Donation.objects.filter(is_taken=False, pick_up_date=pick_up_date)
+        .annotate(zip_prefix=Substr('zip_code', 1, zip_prefix_length), hour=ExtractHour('pick_up_time'))
+        .values('city', 'zip_prefix', 'hour')
+        .annotate(bags=Sum('quantity'), donations=Count('id'))
+        .order_by('city', 'zip_prefix', 'hour')
+    )
+
+
+def pickup_plan(pick_up_date, zip_prefix_length=ZIP_PREFIX_LENGTH):
+    # The (city, postcode prefix, hour) buckets come from one aggregate query
+    # and are only folded into groups here.
+    groups = {}
+    for window in pickup_windows(pick_up_date, zip_prefix_length):
+        group = groups.setdefault((window['city'], window['zip_prefix']), {
+            'city': window['city'],
+            'zip_prefix': window['zip_prefix'],
+            'bags': 0,
+            'donations': 0,
+            'windows': [],
+        })
+        group['bags'] += window['bags']
+        group['donations'] += window['donations']
+        group['windows'].append({
+            'start': f'{window["hour"]:02d}:00',
+            'end': f'{(window["hour"] + 1) % 24:02d}:00',
+            'bags': window['bags'],
+            'donations': window['donations'],
+        })
+    return sorted(groups.values(), key=lambda group: (group['windows'][0]['start'], group['city'], group['zip_prefix']))
@@ -0,0 +1,54 @@
+import re
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import Category, Donation, Institution
+from .pagination import keyset_paginate, keyset_queryset
+from .pickups import pickup_windows
+
+LARGE_TABLES = (
+    Donation._meta.db_table,
+    Donation.categories.through._meta.db_table,
+    User._meta.db_table,
+)
+
+
+def view_querysets():
+    user = User.objects.order_by('pk').first()
+    donations = Donation.objects.select_related('user', 'institution')
+    page = keyset_paginate(Donation.objects.filter(is_taken=False), None, 50)
+    user_donations = Donation.objects.filter(user=user)
+    names = list(Institution.objects.values_list('name', flat=True)[:5])
+    category_names = list(Category.objects.values_list('name', flat=True)[:5])
+
+    return [
+        ('all_donation', donations.order_by('pick_up_date', 'pk')[:51]),
+        ('all_donation is_taken=0', donations.filter(is_taken=False).order_by('pick_up_date', 'pk')[:51]),
+        ('all_donation is_taken=1', donations.filter(is_taken=True).order_by('pick_up_date', 'pk')[:51]),
+        ('all_donation next page', keyset_queryset(donations.filter(is_taken=False), page.next_cursor)[1][:51]),
+        ('donation categories prefetch', Donation.categories.through.objects.filter(
+            donation_id__in=[donation.pk for donation in page.object_list])),
+        ('my_donation', user_donations.select_related('institution').order_by('pick_up_date', 'pk')[:21]),
+        ('my_donation is_taken=1', user_donations.filter(is_taken=True).order_by('pick_up_date', 'pk')[:21]),
+        ('my_donation summary', user_donations.values('user').annotate(
+            total_quantity=Sum('quantity'), donation_count=Count('id'))),
+        ('my_donation per institution', user_donations.values('institution__name').annotate(
+            total_quantity=Sum('quantity'), donation_count=Count('id'))),
+        ('donation post institutions', Institution.objects.filter(name__in=names)),
+        ('donation post categories', Category.objects.filter(name__in=category_names)),
+        ('donation post supported', Donation.objects.filter(institution__name__in=names)
+         .values_list('institution_id', flat=True).distinct()),
+        ('pickup_plan', pickup_windows(date.today())),
+        ('main institutions by type', Institution.objects.filter(type=1).order_by('name')),
+    ]
+
+
+def sequential_scans(plan):
+    if connection.vendor == 'postgresql':
+        scanned = re.findall(r'Seq Scan on "?(\w+)"?', plan)
+    else:
+        scanned = re.findall(r'SCAN (\w+)\b(?! USING)', plan)
+    return sorted({table for table in scanned if table in LARGE_TABLES})
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncWeek
+
+from .models import ArchivedDonation, Donation, DonationRollup
+
+ROLLUP_FIELDS = ('donations', 'bags', 'taken_donations', 'taken_bags')
+# Keys per locking query: each key is one OR'd condition, and SQLite caps the
+# expression depth at 1000.
+LOCK_BATCH_SIZE = 500
+
+
+def donation_deltas(day, institution_id, category_ids, quantity, is_taken, sign=1):
+    taken = int(bool(is_taken))
+    return {
+        (day, institution_id, category_id): {
+            'donations': sign,
+            'bags': sign * quantity,
+            'taken_donations': sign * taken,
+            'taken_bags': sign * quantity * taken,
+        }
+        for category_id in category_ids
+    }
+
+
+def merge_deltas(parts):
+    merged = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for deltas in parts:
+        for key, changes in deltas.items():
+            for field, delta in changes.items():
+                merged[key][field] += delta
+    return merged
+
+
+def apply_rollup_deltas(deltas):
+    # A fixed number of queries per LOCK_BATCH_SIZE keys: missing rows are
+    # inserted empty, exactly the affected rows are locked and read, in key
+    # order so concurrent writers lock in the same order, and the new totals
+    # go back in one bulk_update.
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        DonationRollup.objects.bulk_create([
+            DonationRollup(day=day, institution_id=institution_id, category_id=category_id)
+            for day, institution_id, category_id in deltas
+        ], ignore_conflicts=True, batch_size=1000)
+        keys = sorted(deltas)
+        rollups = [
+            rollup
+            for start in range(0, len(keys), LOCK_BATCH_SIZE)
+            for rollup in DonationRollup.objects.select_for_update().filter(reduce(or_, (
+                Q(day=day, institution_id=institution_id, category_id=category_id)
+                for day, institution_id, category_id in keys[start:start + LOCK_BATCH_SIZE]
+            ))).order_by('day', 'institution_id', 'category_id')
+        ]
+        changed = []
+        for rollup in rollups:
+            changes = deltas.get((rollup.day, rollup.institution_id, rollup.category_id))
+            if changes is None:
+                continue
+            for field, delta in changes.items():
+                setattr(rollup, field, getattr(rollup, field) + delta)
+            changed.append(rollup)
+        DonationRollup.objects.bulk_update(changed, ROLLUP_FIELDS, batch_size=1000)
+
+
+def record_taken(donation_ids):
+    # One grouped query over the category links of the donations just taken.
+    rows = (Donation.categories.through.objects.filter(donation_id__in=donation_ids)
+            .values(day=F('donation__pick_up_date'), institution=F('donation__institution_id'),
+                    category_key=F('category_id'))
+            .annotate(taken_donations=Count('donation_id'), taken_bags=Sum('donation__quantity'))
+            .order_by())
+    apply_rollup_deltas({
+        (row['day'], row['institution'], row['category_key']): {
+            'taken_donations': row['taken_donations'], 'taken_bags': row['taken_bags']}
+        for row in rows
+    })
+
+
+def aggregate_rollups(date_from, date_to, model=Donation):
+    donation = model._meta.model_name
+    return (model.categories.through.objects
+            .filter(**{f'{donation}__pick_up_date__range': (date_from, date_to)})
+            .values(day=F(f'{donation}__pick_up_date'), institution=F(f'{donation}__institution_id'),
+                    category_key=F('category_id'))
+            .annotate(donations=Count(f'{donation}_id'), bags=Sum(f'{donation}__quantity'),
+                      taken_donations=Count(f'{donation}_id', filter=Q(**{f'{donation}__is_taken': True})),
+                      taken_bags=Sum(f'{donation}__quantity', filter=Q(**{f'{donation}__is_taken': True})))
+            .order_by())
+
+
+def donation_date_range():
+    ranges = [model.objects.aggregate(first=Min('pick_up_date'), last=Max('pick_up_date'))
+              for model in (Donation, ArchivedDonation)]
+    firsts = [dates['first'] for dates in ranges if dates['first'] is not None]
+    lasts = [dates['last'] for dates in ranges if dates['last'] is not None]
+    return min(firsts, default=None), max(lasts, default=None)
+
+
+def rebuild_rollups(date_from, date_to):
+    # Idempotent for the range, so an interrupted backfill can be re-run
+    # from where it stopped.
+    with transaction.atomic():
+        DonationRollup.objects.filter(day__range=(date_from, date_to)).delete()
+        totals = merge_deltas({
+            (row['day'], row['institution'], row['category_key']): {
+                field: row[field] or 0 for field in ROLLUP_FIELDS}
+            for row in aggregate_rollups(date_from, date_to, model)
+        } for model in (Donation, ArchivedDonation))
+        rollups = [DonationRollup(day=day, institution_id=institution_id, category_id=category_id, **counts)
+                   for (day, institution_id, category_id), counts in totals.items()]
+        DonationRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+ROLLUP_GROUPS = {
+    'both': ('institution', 'category'),
+    'institution': ('institution',),
+    'category': ('category',),
+}
+
+
+def weekly_rollups(date_from, date_to, group='both', institution=None, category=None):
+    # Reads only the rollup table (plus the small institution and category
+    # tables for names), never Donation.
+    rollups = DonationRollup.objects.filter(day__range=(date_from, date_to)).exclude(donations=0)
+    if institution is not None:
+        rollups = rollups.filter(institution=institution)
+    if category is not None:
+        rollups = rollups.filter(category=category)
+    names = [f'{relation}__name' for relation in ROLLUP_GROUPS[group]]
+    return (rollups.annotate(week=TruncWeek('day'))
+            .values('week', *names)
+            .annotate(**{field: Sum(field) for field in ROLLUP_FIELDS})
+            .order_by('week', *names))
@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Sessions are written on login and read right after, so they never leave
+# the primary.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def use_replica(enabled=True):
+    token = replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    # Reads go to the replica only inside use_replica() or a view marked with
+    # ``read_replica = True``; everything else, and every write, uses default.
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == REPLICA:
+            return REPLICA
+        if replica_reads.get() and replica_configured() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # No allow_migrate: the replica has the primary's schema. migrate only
+    # touches the database named by --database, and the test runner needs the
+    # schema on the separate replica test database.
+
+
+class ReplicaRoutingMiddleware:
+    # After an unsafe request the client gets a short-lived cookie which keeps
+    # its reads on the primary until the replica has caught up with its write.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = replica_reads.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = replica_reads.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        return self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        read_replica = getattr(view_class, 'read_replica', getattr(view_func, 'read_replica', False))
+        if read_replica and request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES:
+            replica_reads.set(True)
+
+    def pin(self, request, response):
+        if replica_configured() and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
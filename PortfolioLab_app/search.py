@@ -0,0 +1,100 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Institution
+
+INSTITUTION_TABLE = Institution._meta.db_table
+# SQLite keeps the index in an FTS5 table whose rowid is the institution id;
+# PostgreSQL keeps a weighted tsvector column with a GIN index on the table.
+FTS_TABLE = 'PortfolioLab_app_institution_fts'
+VECTOR_SQL = ("setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A') || "
+              "setweight(to_tsvector(%s::regconfig, coalesce(description, '')), 'B')")
+MAX_TERMS = 10
+
+_configs = {}
+
+
+def search_config(connection):
+    # The 'polish' configuration needs a Polish dictionary installed on the
+    # server; without it 'simple' still matches whole words and prefixes.
+    if connection.alias not in _configs:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = 'polish'")
+            _configs[connection.alias] = 'polish' if cursor.fetchone() else 'simple'
+    return _configs[connection.alias]
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def index_institution(pk, using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            config = search_config(connection)
+            cursor.execute(f'UPDATE "{INSTITUTION_TABLE}" SET search_vector = {VECTOR_SQL} WHERE id = %s',
+                           [config, config, pk])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [pk])
+            cursor.execute(f'INSERT INTO "{FTS_TABLE}" (rowid, name, description) '
+                           f'SELECT id, name, description FROM "{INSTITUTION_TABLE}" WHERE id = %s', [pk])
+
+
+def remove_institution(pk, using='default'):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [pk])
+
+
+def rebuild_search_index(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _configs.pop(using, None)
+            config = search_config(connection)
+            cursor.execute(f'UPDATE "{INSTITUTION_TABLE}" SET search_vector = {VECTOR_SQL}', [config, config])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+            cursor.execute(f'INSERT INTO "{FTS_TABLE}" (rowid, name, description) '
+                           f'SELECT id, name, description FROM "{INSTITUTION_TABLE}"')
+
+
+def search_institutions(query, queryset=None):
+    """Institutions matching every word of ``query`` as a prefix, annotated with ``rank``."""
+    if queryset is None:
+        queryset = Institution.objects.all()
+    terms = search_terms(query)
+    if not terms:
+        # Still annotated, so ordering by rank works on the empty result.
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        config = search_config(connection)
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        column = f'"{INSTITUTION_TABLE}".search_vector'
+        return queryset.filter(
+            RawSQL(f'{column} @@ to_tsquery(%s::regconfig, %s)', [config, tsquery], output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL(f'ts_rank({column}, to_tsquery(%s::regconfig, %s))', [config, tsquery],
+                        output_field=FloatField()))
+
+    if connection.vendor == 'sqlite':
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', [fts_query])
+        ).annotate(
+            # bm25() is lower for better matches; name hits weigh ten times more.
+            rank=RawSQL(f'(SELECT -bm25("{FTS_TABLE}", 10.0, 1.0) FROM "{FTS_TABLE}" '
+                        f'WHERE "{FTS_TABLE}" MATCH %s AND rowid = "{INSTITUTION_TABLE}".id)', [fts_query],
+                        output_field=FloatField()))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
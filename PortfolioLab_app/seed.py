@@ -0,0 +1,93 @@
+import random
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from .catalogue import invalidate_institution_catalogue
+from .models import TYPE, Category, Donation, Institution
+from .page_cache import invalidate_page_cache
+from .rollups import donation_date_range, rebuild_rollups
+from .search import rebuild_search_index
+from .stats import rebuild_donation_stats
+
+SEED_PASSWORD = 'Haslo123!'
+CITIES = ('Warszawa', 'Kraków', 'Łódź', 'Wrocław', 'Poznań', 'Gdańsk', 'Szczecin', 'Lublin')
+
+
+def seed_dataset(institutions=100, categories=10, users=100, donations=10000, batch_size=5000, seed=0):
+    # Rows go in with bulk_create, so the signal-maintained stats and caches
+    # are rebuilt once at the end instead of per row.
+    rng = random.Random(seed)
+    with transaction.atomic():
+        category_objs = Category.objects.bulk_create(
+            Category(name=f'Kategoria {n}') for n in range(categories))
+        institution_objs = Institution.objects.bulk_create(
+            Institution(name=f'Instytucja {n}', description=f'Opis instytucji {n}', type=rng.choice(TYPE)[0])
+            for n in range(institutions))
+        Institution.category.through.objects.bulk_create(
+            Institution.category.through(institution_id=institution.pk, category_id=category.pk)
+            for institution in institution_objs
+            for category in rng.sample(category_objs, min(len(category_objs), rng.randint(1, 3))))
+
+        password = make_password(SEED_PASSWORD)
+        user_objs = User.objects.bulk_create(
+            User(username=f'user{n}@example.com', password=password, first_name=f'Użytkownik {n}',
+                 is_staff=n == 0, is_superuser=n == 0)
+            for n in range(users))
+
+        today = date.today()
+        for start in range(0, donations, batch_size):
+            donation_objs = Donation.objects.bulk_create(
+                Donation(
+                    quantity=rng.randint(1, 10),
+                    institution=rng.choice(institution_objs),
+                    address=f'ul. Testowa {n}',
+                    phone_number=500000000 + n,
+                    city=rng.choice(CITIES),
+                    zip_code=f'{rng.randint(0, 99):02d}-{rng.randint(0, 999):03d}',
+                    pick_up_date=today + timedelta(days=rng.randint(-365, 30)),
+                    pick_up_time=time(rng.randint(8, 19), rng.choice((0, 30))),
+                    pick_up_comment='',
+                    user=rng.choice(user_objs) if user_objs else None,
+                    is_taken=rng.random() < 0.6,
+                )
+                for n in range(start, min(start + batch_size, donations)))
+            Donation.categories.through.objects.bulk_create(
+                Donation.categories.through(donation_id=donation.pk, category_id=category.pk)
+                for donation in donation_objs
+                for category in rng.sample(category_objs, min(len(category_objs), rng.randint(1, 3))))
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    rebuild_donation_stats()
+    rebuild_rollups(*donation_date_range())
+    rebuild_search_index()
+    invalidate_institution_catalogue()
+    invalidate_page_cache()
+    return {'institutions': institutions, 'categories': categories, 'users': users, 'donations': donations}
+
+
+@contextmanager
+def seeded_test_database(**counts):
+    # Only the primary is created and seeded; every other alias (the replica)
+    # is pointed at it, as TEST['MIRROR'] does in the test runner, so views
+    # reading from the replica see the seeded rows instead of a missing table.
+    old_name = connection.settings_dict['NAME']
+    mirrors = {alias: connections[alias].settings_dict['NAME']
+               for alias in connections if alias != DEFAULT_DB_ALIAS}
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        seed_dataset(**counts)
+        yield
+    finally:
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,181 @@
+from django.db import transaction
+from django.db.models import Count, QuerySet, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .archive import archiving
+from .catalogue import invalidate_institution_catalogue
+from .category_index import invalidate_category_index
+from .models import ArchivedDonation, Category, Donation, Institution
+from .page_cache import invalidate_page_cache
+from .rollups import apply_rollup_deltas, donation_deltas, merge_deltas
+from .search import index_institution, remove_institution
+from .stats import institution_supported, update_donation_stats
+
+
+@receiver(pre_save, sender=Donation)
+def remember_previous_donation(sender, instance, **kwargs):
+    instance._stats_previous = instance._rollup_previous = None
+    if instance.pk:
+        previous = Donation.objects.filter(pk=instance.pk).values_list(
+            'quantity', 'institution_id', 'pick_up_date', 'is_taken').first()
+        if previous is not None:
+            instance._stats_previous = previous[:2]
+            instance._rollup_previous = previous
+
+
+@receiver(post_save, sender=Donation)
+def count_saved_donation(sender, instance, created, **kwargs):
+    if created or instance._stats_previous is None:
+        update_donation_stats(total_quantity=int(instance.quantity), donation_count=1,
+                              supported_institutions=int(first_for_institution(instance)))
+        return
+
+    previous_quantity, previous_institution_id = instance._stats_previous
+    supported_delta = 0
+    if previous_institution_id != instance.institution_id:
+        supported_delta = int(first_for_institution(instance)) - int(not institution_supported(previous_institution_id))
+    update_donation_stats(total_quantity=int(instance.quantity) - previous_quantity,
+                          supported_institutions=supported_delta)
+
+
+def first_for_institution(donation):
+    return not (
+        Donation.objects.filter(institution_id=donation.institution_id).exclude(pk=donation.pk).exists()
+        or ArchivedDonation.objects.filter(institution_id=donation.institution_id).exists())
+
+
+def deleting_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(post_save, sender=Donation)
+def roll_up_saved_donation(sender, instance, created, **kwargs):
+    # New donations are counted when their categories are added.
+    previous = getattr(instance, '_rollup_previous', None)
+    if created or previous is None:
+        return
+    quantity, institution_id, pick_up_date, is_taken = previous
+    current = (int(instance.quantity), instance.institution_id, instance.pick_up_date, instance.is_taken)
+    if (quantity, institution_id, pick_up_date, is_taken) == current:
+        return
+    category_ids = list(instance.categories.values_list('id', flat=True))
+    apply_rollup_deltas(merge_deltas([
+        donation_deltas(pick_up_date, institution_id, category_ids, quantity, is_taken, sign=-1),
+        donation_deltas(instance.pick_up_date, instance.institution_id, category_ids, int(instance.quantity),
+                        instance.is_taken),
+    ]))
+
+
+@receiver(m2m_changed, sender=Donation.categories.through)
+def roll_up_donation_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_add gets only the links really added. remove() passes every pk it
+    # was given, linked or not, so removals are counted in pre_remove from the
+    # links that still exist; pre_clear is the only case covering all links.
+    if action in ('post_add', 'pre_remove'):
+        if not pk_set:
+            return
+    elif action != 'pre_clear':
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        donations = instance.donation_set.all() if action == 'pre_clear' else Donation.objects.filter(pk__in=pk_set)
+        if action == 'pre_remove':
+            donations = donations.filter(categories=instance)
+        pairs = [(donation, [instance.pk]) for donation in donations]
+    elif action == 'post_add':
+        pairs = [(instance, list(pk_set))]
+    else:
+        category_ids = instance.categories.values_list('id', flat=True)
+        if action == 'pre_remove':
+            category_ids = category_ids.filter(pk__in=pk_set)
+        pairs = [(instance, list(category_ids))]
+    apply_rollup_deltas(merge_deltas(
+        donation_deltas(donation.pick_up_date, donation.institution_id, category_ids, int(donation.quantity),
+                        donation.is_taken, sign)
+        for donation, category_ids in pairs
+    ))
+
+
+@receiver(pre_delete, sender=Donation)
+def roll_up_deleted_donation(sender, instance, **kwargs):
+    if archiving.get():
+        return
+    category_ids = list(instance.categories.values_list('id', flat=True))
+    apply_rollup_deltas(donation_deltas(instance.pick_up_date, instance.institution_id, category_ids,
+                                        int(instance.quantity), instance.is_taken, sign=-1))
+
+
+@receiver(post_delete, sender=Donation)
+def count_deleted_donation(sender, instance, origin=None, **kwargs):
+    # Archived donations stay in the all-time stats and the rollups.
+    if archiving.get():
+        return
+    update_donation_stats(total_quantity=-int(instance.quantity), donation_count=-1)
+    # One delete() sends post_delete for every row after the whole batch is
+    # gone, so each institution is checked once per origin. An institution's
+    # own delete settles its supported flag in count_deleted_institution.
+    if deleting_model(origin) is Institution:
+        return
+    checked = origin.__dict__.setdefault('_supported_checked', set()) if origin is not None else set()
+    if instance.institution_id in checked:
+        return
+    checked.add(instance.institution_id)
+    if not institution_supported(instance.institution_id):
+        update_donation_stats(supported_institutions=-1)
+
+
+@receiver(post_save, sender=Institution)
+def count_saved_institution(sender, instance, created, **kwargs):
+    if created:
+        update_donation_stats(institution_count=1)
+
+
+@receiver(pre_delete, sender=Institution)
+def remember_archived_totals(sender, instance, **kwargs):
+    # Archived donations go with the institution through a cascade that sends
+    # no signals, so their share of the stats is taken out here.
+    instance._archived_totals = ArchivedDonation.objects.filter(institution=instance).aggregate(
+        total_quantity=Sum('quantity'), donation_count=Count('id'))
+    instance._was_supported = institution_supported(instance.pk)
+
+
+@receiver(post_delete, sender=Institution)
+def count_deleted_institution(sender, instance, **kwargs):
+    archived = getattr(instance, '_archived_totals', None) or {'total_quantity': None, 'donation_count': 0}
+    update_donation_stats(institution_count=-1, total_quantity=-(archived['total_quantity'] or 0),
+                          donation_count=-archived['donation_count'],
+                          supported_institutions=-int(getattr(instance, '_was_supported', False)))
+
+
+@receiver(post_save, sender=Institution)
+def index_saved_institution(sender, instance, using, **kwargs):
+    index_institution(instance.pk, using)
+
+
+@receiver(post_delete, sender=Institution)
+def unindex_deleted_institution(sender, instance, using, **kwargs):
+    remove_institution(instance.pk, using)
+
+
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Institution.category.through)
+def invalidate_catalogue(sender, **kwargs):
+    transaction.on_commit(invalidate_institution_catalogue)
+    transaction.on_commit(invalidate_category_index)
+
+
+@receiver(post_save, sender=Donation)
+@receiver(post_delete, sender=Donation)
+@receiver(post_save, sender=Institution)
+@receiver(post_delete, sender=Institution)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(m2m_changed, sender=Institution.category.through)
+def invalidate_pages(sender, **kwargs):
+    if archiving.get():
+        return
+    transaction.on_commit(invalidate_page_cache)
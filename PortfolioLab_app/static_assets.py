@@ -0,0 +1,131 @@
+import gzip
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.xml', '.map')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60
+
+
+def compressors():
+    variants = [('.gz', 'gzip', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.insert(0, ('.br', 'br', lambda data: brotli.compress(data, quality=11)))
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # After hashing, every text asset gets .br and .gz siblings, written only
+    # when they come out smaller than the original.
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, _, compress in compressors():
+            compressed = compress(data)
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) < len(data):
+                self._save(name + suffix, ContentFile(compressed))
+
+
+def compression_report(storage=None):
+    storage = storage or staticfiles_storage
+    rows = []
+    for original, hashed in sorted(storage.hashed_files.items()):
+        if not storage.exists(hashed):
+            continue
+        row = {'name': original, 'hashed_name': hashed, 'bytes': storage.size(hashed)}
+        for suffix, encoding, _ in compressors():
+            row[encoding] = storage.size(hashed + suffix) if storage.exists(hashed + suffix) else None
+        rows.append(row)
+    return rows
+
+
+class PrecompressedStaticMiddleware:
+    # Serves STATIC_ROOT directly, picking the best precompressed variant the
+    # client accepts. Hashed names never change content, so they are cached
+    # for a year; anything else only briefly.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.is_static_request(request):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Only static paths touch the filesystem off the event loop; every
+        # other request goes straight on to the async handler.
+        if self.is_static_request(request):
+            response = await sync_to_async(self.serve)(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def is_static_request(self, request):
+        return bool(settings.STATIC_ROOT) and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix)
+
+    @property
+    def prefix(self):
+        return '/' + settings.STATIC_URL.lstrip('/')
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        accepted = request.headers.get('Accept-Encoding', '')
+        content_encoding = None
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            for suffix, encoding, _ in compressors():
+                if encoding in accepted and os.path.isfile(path + suffix):
+                    path, content_encoding = path + suffix, encoding
+                    break
+
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        del response['Content-Disposition']
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            response['Vary'] = 'Accept-Encoding'
+        if name in getattr(staticfiles_storage, 'hashed_files', {}).values():
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={MUTABLE_MAX_AGE}'
+        return response
@@ -0,0 +1,55 @@
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Exists, F, OuterRef, Sum
+
+from .models import ArchivedDonation, Donation, DonationStats, Institution
+
+STATS_PK = 1
+
+
+# The stats row is read from the primary, like the catalogue: it is cached
+# with the home page, so a lagging replica would keep stale totals there.
+def get_donation_stats():
+    try:
+        return DonationStats.objects.using(DEFAULT_DB_ALIAS).get(pk=STATS_PK)
+    except DonationStats.DoesNotExist:
+        return rebuild_donation_stats()
+
+
+async def aget_donation_stats():
+    try:
+        return await DonationStats.objects.using(DEFAULT_DB_ALIAS).aget(pk=STATS_PK)
+    except DonationStats.DoesNotExist:
+        return await sync_to_async(rebuild_donation_stats)()
+
+
+def count_supported_institutions():
+    # Archived donations still count: the stats cover all time.
+    return Institution.objects.using(DEFAULT_DB_ALIAS).filter(
+        Exists(Donation.objects.filter(institution=OuterRef('pk')))
+        | Exists(ArchivedDonation.objects.filter(institution=OuterRef('pk')))
+    ).count()
+
+
+def rebuild_donation_stats():
+    totals = [model.objects.using(DEFAULT_DB_ALIAS).aggregate(total_quantity=Sum('quantity'), donation_count=Count('id'))
+              for model in (Donation, ArchivedDonation)]
+    stats, _ = DonationStats.objects.update_or_create(pk=STATS_PK, defaults={
+        'total_quantity': sum(total['total_quantity'] or 0 for total in totals),
+        'donation_count': sum(total['donation_count'] for total in totals),
+        'supported_institutions': count_supported_institutions(),
+        'institution_count': Institution.objects.count(),
+    })
+    return stats
+
+
+def update_donation_stats(**deltas):
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes and not DonationStats.objects.filter(pk=STATS_PK).update(**changes):
+        rebuild_donation_stats()
+
+
+def institution_supported(institution_id):
+    # Two indexed EXISTS probes instead of recounting every institution.
+    return (Donation.objects.filter(institution_id=institution_id).exists()
+            or ArchivedDonation.objects.filter(institution_id=institution_id).exists())
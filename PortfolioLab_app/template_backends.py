@@ -0,0 +1,36 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import template_profiler
+from .instrumentation import record_template_time
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record_template_time(time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    # OPTIONS['profile'] turns on the per-template and per-block profiler.
+
+    def __init__(self, params):
+        params = params.copy()
+        params['OPTIONS'] = options = params.get('OPTIONS', {}).copy()
+        if options.pop('profile', False):
+            template_profiler.install()
+        super().__init__(params)
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
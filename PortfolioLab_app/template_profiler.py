@@ -0,0 +1,95 @@
+import threading
+import time
+from functools import wraps
+
+from django.template.base import Template
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import BlockNode
+
+from .instrumentation import current_metrics
+
+# Totals live in this process only; with several workers each one profiles
+# the requests it served.
+_lock = threading.Lock()
+_stats = {}
+_originals = {}
+
+
+def _query_count():
+    metrics = current_metrics.get()
+    return len(metrics.queries) if metrics is not None else 0
+
+
+def record(template_name, label, seconds, queries):
+    with _lock:
+        entry = _stats.setdefault((template_name, label), {'calls': 0, 'time': 0.0, 'max_time': 0.0, 'queries': 0})
+        entry['calls'] += 1
+        entry['time'] += seconds
+        entry['max_time'] = max(entry['max_time'], seconds)
+        entry['queries'] += queries
+
+
+def _template_name(origin):
+    return getattr(origin, 'template_name', None) or '<string>'
+
+
+def _describe_template(template):
+    return _template_name(template.origin), 'szablon'
+
+
+def _describe_for(node):
+    loop = f'{{% for {", ".join(node.loopvars)} in {node.sequence.token} %}}'
+    return _template_name(node.origin), f'{loop} (linia {node.token.lineno})'
+
+
+def _describe_block(node):
+    return _template_name(node.origin), f'{{% block {node.name} %}}'
+
+
+def _profiled(render, describe):
+    @wraps(render)
+    def wrapper(self, context):
+        start = time.perf_counter()
+        queries = _query_count()
+        try:
+            return render(self, context)
+        finally:
+            record(*describe(self), time.perf_counter() - start, _query_count() - queries)
+    return wrapper
+
+
+def install():
+    # Times are inclusive: a template counts its blocks and loops, a block
+    # counts the loops inside it.
+    with _lock:
+        for cls, method, describe in ((Template, '_render', _describe_template),
+                                      (ForNode, 'render', _describe_for),
+                                      (BlockNode, 'render', _describe_block)):
+            if (cls, method) not in _originals:
+                _originals[cls, method] = getattr(cls, method)
+                setattr(cls, method, _profiled(_originals[cls, method], describe))
+
+
+def is_installed():
+    return bool(_originals)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    with _lock:
+        items = [(key, dict(entry)) for key, entry in _stats.items()]
+    rows = [{
+        'template': template_name,
+        'node': label,
+        'calls': entry['calls'],
+        'total_ms': round(entry['time'] * 1000, 2),
+        'avg_ms': round(entry['time'] * 1000 / entry['calls'], 3),
+        'max_ms': round(entry['max_time'] * 1000, 2),
+        'queries': entry['queries'],
+        'queries_per_call': round(entry['queries'] / entry['calls'], 2),
+    } for (template_name, label), entry in items]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
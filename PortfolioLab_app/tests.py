@@ -1,3 +1,959 @@
-from django.test import TestCase
+import csv
+import json
+import re
+from datetime import date, time, timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DEFAULT_DB_ALIAS, connection, router
+from django.template.loader import get_template
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .api_auth import create_api_token
+from .archive import archive_batch
+from .catalogue import CATALOGUE_CACHE_KEY, get_institution_catalogue
+from .digests import build_digests, send_digest, send_pickup_digests
+from .intake import create_donations
+from .models import Category, Donation, DonationRollup, DonationStats, Institution, OutboxEmail, PickupDigest
+from .outbox import deliver_outbox, queue_email
+from .page_cache import _keys, invalidate_page_cache
+from .pagination import (EXACT_COUNT_LIMIT, EstimatedCountPaginator, decode_cursor, encode_cursor, estimated_count,
+                         keyset_paginate)
+from .pickups import mark_donations_taken
+from .rollups import LOCK_BATCH_SIZE, ROLLUP_FIELDS, apply_rollup_deltas, donation_date_range, rebuild_rollups
+from .routers import PIN_COOKIE, REPLICA, use_replica
+from .search import rebuild_search_index, search_institutions
+from .stats import STATS_PK, get_donation_stats, rebuild_donation_stats
+from .throttle import check_throttle
+from .views import (AllDonationView, DonationAnalyticsView, DonationIntakeView, DonationView, InstitutionSearchView,
+                    MainView, PickupPlanView, UserDonation)
+
+
+def make_institution(name, **fields):
+    fields.setdefault('description', 'opis')
+    return Institution.objects.create(name=name, **fields)
+
+
+def make_donation(institution, categories=(), **fields):
+    fields = {
+        'quantity': 2, 'address': 'Długa 1', 'phone_number': 123456789, 'city': 'Kraków', 'zip_code': '30-001',
+        'pick_up_date': date(2026, 11, 2), 'pick_up_time': time(12), 'pick_up_comment': '', **fields,
+    }
+    donation = Donation.objects.create(institution=institution, **fields)
+    donation.categories.set(categories)
+    return donation
+
+
+def stats_tuple(stats):
+    return stats.total_quantity, stats.donation_count, stats.supported_institutions, stats.institution_count
+
+
+class PrimaryReplicaRouterTest(TestCase):
+    # Run with --settings=PortfolioLab.test_settings, where default and
+    # replica are two separate SQLite databases.
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        Institution.objects.using(DEFAULT_DB_ALIAS).create(name='Fundacja Pierwsza', description='na primary')
+        Institution.objects.using(REPLICA).create(name='Fundacja Repliki', description='na replice')
+
+    def search(self, q):
+        response = self.client.get('/search/', {'q': q, 'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def test_reads_go_to_default_outside_replica_context(self):
+        self.assertEqual(router.db_for_read(Institution), DEFAULT_DB_ALIAS)
+        with use_replica():
+            self.assertEqual(router.db_for_read(Institution), REPLICA)
+
+    def test_writes_go_to_default(self):
+        with use_replica():
+            self.assertEqual(router.db_for_write(Institution), DEFAULT_DB_ALIAS)
+            Institution.objects.create(name='Fundacja Nowa', description='zapis')
+        self.assertTrue(Institution.objects.using(DEFAULT_DB_ALIAS).filter(name='Fundacja Nowa').exists())
+        self.assertFalse(Institution.objects.using(REPLICA).filter(name='Fundacja Nowa').exists())
+
+    def test_read_replica_view_reads_from_replica(self):
+        self.assertEqual(self.search('fundacja'), ['Fundacja Repliki'])
+
+    def test_unsafe_request_pins_reads_to_primary(self):
+        response = self.client.post('/login/', {'login': 'nikt@example.com', 'password': 'zle'})
+        self.assertLess(response.status_code, 400)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.search('fundacja'), ['Fundacja Pierwsza'])
+
+    def test_failed_unsafe_request_does_not_pin(self):
+        response = self.client.post('/search/')
+        self.assertEqual(response.status_code, 405)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_sessions_stay_on_primary(self):
+        with use_replica():
+            self.assertEqual(router.db_for_read(Session), DEFAULT_DB_ALIAS)
+            session = SessionStore()
+            session['donor'] = 'tak'
+            session.create()
+            self.assertEqual(SessionStore(session.session_key).load(), {'donor': 'tak'})
+        self.assertFalse(Session.objects.using(REPLICA).exists())
+
+    def test_logged_in_user_keeps_session_on_replica_view(self):
+        user = User.objects.create_user('darczynca@example.com', password='Haslo123!')
+        self.client.force_login(user)
+        self.search('fundacja')
+        self.assertEqual(int(self.client.session['_auth_user_id']), user.pk)
+
+    def test_home_page_stats_come_from_primary(self):
+        DonationStats.objects.using(DEFAULT_DB_ALIAS).update_or_create(pk=STATS_PK, defaults={'total_quantity': 10})
+        DonationStats.objects.using(REPLICA).update_or_create(pk=STATS_PK, defaults={'total_quantity': 3})
+        with use_replica():
+            self.assertEqual(get_donation_stats().total_quantity, 10)
+
+
+class HomePageTest(TestCase):
+    def test_home_page_renders_static_urls(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/css/style.css')
+
+
+class DonationIntakeAuthTest(TestCase):
+    def setUp(self):
+        Category.objects.create(name='ubrania')
+        Institution.objects.create(name='Fundacja Pierwsza', description='opis')
+        self.partner = User.objects.create_user('punkt@example.com', password='Haslo123!')
+        self.client = Client(enforce_csrf_checks=True)
+        self.payload = json.dumps({'donations': [{
+            'institution': 'Fundacja Pierwsza', 'categories': ['ubrania'], 'quantity': 2, 'address': 'Długa 1',
+            'phone_number': '123456789', 'city': 'Kraków', 'zip_code': '30-001', 'pick_up_date': '2026-11-02',
+            'pick_up_time': '12:00',
+        }]})
+
+    def post(self, **headers):
+        return self.client.post('/api/donations/bulk/', self.payload, content_type='application/json', headers=headers)
+
+    def test_token_posts_without_csrf(self):
+        key = create_api_token(self.partner, 'Punkt Kraków')
+        response = self.post(Authorization=f'Bearer {key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Donation.objects.get().user, self.partner)
+
+    def test_recently_used_token_is_not_rewritten(self):
+        key = create_api_token(self.partner, 'Punkt Kraków')
+        self.post(Authorization=f'Bearer {key}')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post(Authorization=f'Bearer {key}').status_code, 201)
+        self.assertFalse([query for query in queries if 'PortfolioLab_app_apitoken' in query['sql']
+                          and query['sql'].startswith('UPDATE')])
+
+    def test_unknown_token_is_rejected(self):
+        self.assertEqual(self.post(Authorization='Bearer nieznany').status_code, 401)
+        self.assertFalse(Donation.objects.exists())
+
+    def test_session_still_needs_csrf_token(self):
+        staff = User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.post().status_code, 403)
+        self.assertFalse(Donation.objects.exists())
+
+
+class DonationStatsTest(TestCase):
+    def setUp(self):
+        self.first = make_institution('Fundacja Pierwsza')
+        self.second = make_institution('Fundacja Druga')
+
+    def assertStatsMatchRebuild(self):
+        counted = stats_tuple(get_donation_stats())
+        self.assertEqual(counted, stats_tuple(rebuild_donation_stats()))
+        return counted
+
+    def test_save_counts_quantity_and_supported_institutions(self):
+        make_donation(self.first, quantity=3)
+        make_donation(self.first, quantity=4)
+        self.assertEqual(self.assertStatsMatchRebuild(), (7, 2, 1, 2))
+
+    def test_moving_donation_to_another_institution(self):
+        donation = make_donation(self.first, quantity=3)
+        donation.institution = self.second
+        donation.quantity = 5
+        donation.save()
+        self.assertEqual(self.assertStatsMatchRebuild(), (5, 1, 1, 2))
+
+    def test_delete_keeps_institution_supported_while_it_has_donations(self):
+        make_donation(self.first)
+        donation = make_donation(self.first)
+        donation.delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (2, 1, 1, 2))
+        Donation.objects.filter(institution=self.first).delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (0, 0, 0, 2))
+
+    def test_bulk_delete_decrements_supported_once(self):
+        for _ in range(3):
+            make_donation(self.first)
+        make_donation(self.second)
+        Donation.objects.filter(institution=self.first).delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (2, 1, 1, 2))
+
+    def test_institution_delete_cascades_without_recount(self):
+        for _ in range(3):
+            make_donation(self.first)
+        make_donation(self.second)
+        self.first.delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (2, 1, 1, 1))
+
+    def archive_first(self):
+        make_donation(self.first, quantity=3, is_taken=True, pick_up_date=date(2020, 1, 1))
+        self.assertEqual(archive_batch(date(2021, 1, 1)), 1)
+        # Archived donations stay in the all-time stats.
+        self.assertEqual(self.assertStatsMatchRebuild(), (3, 1, 1, 2))
+
+    def test_intake_for_institution_with_only_archived_donations(self):
+        self.archive_first()
+        create_donations([{
+            'institution': name, 'categories': [], 'quantity': 2, 'address': 'Długa 1', 'phone_number': '123456789',
+            'city': 'Kraków', 'zip_code': '30-001', 'pick_up_date': '2026-11-02', 'pick_up_time': '12:00',
+        } for name in ('Fundacja Pierwsza', 'Fundacja Druga')])
+        self.assertEqual(self.assertStatsMatchRebuild(), (7, 3, 2, 2))
+
+    def test_deleting_live_donations_keeps_archived_support(self):
+        self.archive_first()
+        make_donation(self.first).delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (3, 1, 1, 2))
+
+    def test_institution_delete_removes_archived_donations(self):
+        self.archive_first()
+        make_donation(self.second, quantity=4)
+        self.first.delete()
+        self.assertEqual(self.assertStatsMatchRebuild(), (4, 1, 1, 1))
+
+
+class InstitutionCatalogueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clothes = Category.objects.create(name='ubrania')
+        self.toys = Category.objects.create(name='zabawki')
+        institution = make_institution('Fundacja Pierwsza', type=1)
+        institution.category.set([self.clothes, self.toys])
+        make_institution('Zbiórka Osiedlowa', type=3)
+
+    def test_groups_institutions_by_type_with_categories(self):
+        catalogue = get_institution_catalogue()
+        self.assertEqual([row['name'] for row in catalogue[1]], ['Fundacja Pierwsza'])
+        self.assertEqual(sorted(catalogue[1][0]['categories']), ['ubrania', 'zabawki'])
+        self.assertEqual(catalogue[2], [])
+        self.assertEqual([row['name'] for row in catalogue[3]], ['Zbiórka Osiedlowa'])
+
+    def test_cached_catalogue_needs_no_queries(self):
+        get_institution_catalogue()
+        with self.assertNumQueries(0):
+            get_institution_catalogue()
+
+    def test_institution_changes_invalidate_catalogue(self):
+        get_institution_catalogue()
+        with self.captureOnCommitCallbacks(execute=True):
+            institution = make_institution('Fundacja Nowa', type=2)
+        self.assertIsNone(cache.get(CATALOGUE_CACHE_KEY))
+        self.assertEqual([row['name'] for row in get_institution_catalogue()[2]], ['Fundacja Nowa'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            institution.category.add(self.toys)
+        self.assertEqual(get_institution_catalogue()[2][0]['categories'], ['zabawki'])
+
+    def test_category_rename_invalidates_catalogue(self):
+        get_institution_catalogue()
+        self.clothes.name = 'odzież'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clothes.save()
+        self.assertIn('odzież', get_institution_catalogue()[1][0]['categories'])
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.institution = make_institution('Fundacja Pierwsza')
+
+    def get_home(self, **params):
+        response = self.client.get('/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Page-Cache')
+
+    def test_anonymous_page_is_cached_until_invalidated(self):
+        self.assertEqual(self.get_home(), 'miss')
+        self.assertEqual(self.get_home(), 'hit')
+        self.assertEqual(self.get_home(page=2), 'miss')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_donation(self.institution)
+        self.assertEqual(self.get_home(), 'miss')
+        self.assertEqual(self.get_home(), 'hit')
+
+    def test_rendered_totals_follow_invalidation(self):
+        self.client.get('/')
+        with self.captureOnCommitCallbacks(execute=True):
+            make_donation(self.institution, quantity=7)
+        self.assertEqual(self.client.get('/').context['total_quantity'], 7)
+
+    def test_logged_in_users_bypass_cache(self):
+        self.client.force_login(User.objects.create_user('darczynca@example.com', password='Haslo123!'))
+        self.assertIsNone(self.get_home())
+        self.assertIsNone(self.get_home())
+
+    def test_concurrent_miss_serves_stale_copy_while_locked(self):
+        self.get_home()
+        invalidate_page_cache()
+        request = self.client.get('/').wsgi_request
+        # A miss in another worker holds the lock for the new generation.
+        key, _, lock_key = _keys(request, cache.get('page_cache:generation'))
+        cache.delete(key)
+        cache.add(lock_key, 1)
+        self.assertEqual(self.get_home(), 'stale')
+
+    @override_settings(PAGE_CACHE_LOCK_WAIT=0.1)
+    def test_locked_miss_without_stale_copy_renders_directly(self):
+        request = self.client.get('/').wsgi_request
+        key, stale_key, lock_key = _keys(request, cache.get('page_cache:generation'))
+        cache.delete_many([key, stale_key])
+        cache.add(lock_key, 1)
+        self.assertIsNone(self.get_home())
+        self.assertIsNone(cache.get(key))
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        institution = make_institution('Fundacja Pierwsza')
+        # Two donations share each date, so pages are also cut inside a date.
+        self.donations = [make_donation(institution, pick_up_date=date(2026, 11, 1) + timedelta(days=n // 2))
+                          for n in range(5)]
+        self.queryset = Donation.objects.all()
+
+    def ids(self, page):
+        return [donation.pk for donation in page]
+
+    def test_pages_forward_and_back(self):
+        expected = [donation.pk for donation in self.donations]
+        first = keyset_paginate(self.queryset, None, 2)
+        self.assertEqual(self.ids(first), expected[:2])
+        self.assertFalse(first.has_previous)
+
+        second = keyset_paginate(self.queryset, first.next_cursor, 2)
+        self.assertEqual(self.ids(second), expected[2:4])
+        third = keyset_paginate(self.queryset, second.next_cursor, 2)
+        self.assertEqual(self.ids(third), expected[4:])
+        self.assertFalse(third.has_next)
+
+        back = keyset_paginate(self.queryset, third.previous_cursor, 2)
+        self.assertEqual(self.ids(back), expected[2:4])
+        self.assertTrue(back.has_next)
+        back = keyset_paginate(self.queryset, back.previous_cursor, 2)
+        self.assertEqual(self.ids(back), expected[:2])
+        self.assertFalse(back.has_previous)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        # Garbage, a cut-off cursor and a well-formed one with an unknown direction.
+        for cursor in ('nie-kursor', encode_cursor('next', self.donations[0], 'pick_up_date')[:-4] + '!!!!',
+                       'c2lkZXdheXM6MjAyNi0xMS0wMToxCg=='):
+            self.assertEqual(decode_cursor(cursor), (None, None, None))
+            self.assertEqual(self.ids(keyset_paginate(self.queryset, cursor, 2)), self.ids(self.donations[:2]))
+
+    def test_staff_list_accepts_tampered_cursor(self):
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+        response = self.client.get('/all_donation/', {'cursor': 'nie-kursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response.context['page']), self.ids(self.donations))
+
+
+class QueryBudgetTest(TestCase):
+    # The search view reads from the replica, so both databases are needed.
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        categories = [Category.objects.create(name=name) for name in ('ubrania', 'zabawki')]
+        self.staff = User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True)
+        for number, institution_type in enumerate((1, 2, 3, 1, 2)):
+            institution = make_institution(f'Fundacja {number}', type=institution_type)
+            institution.category.set(categories)
+            for _ in range(3):
+                make_donation(institution, categories, user=self.staff, pick_up_date=date.today())
+
+    def assertWithinBudget(self, view_class, response):
+        self.assertLess(response.status_code, 400)
+        queries = int(re.search(r'(\d+) queries', response['Server-Timing']).group(1))
+        self.assertLessEqual(queries, view_class.query_budget, response.wsgi_request.path)
+
+    def test_anonymous_home_page(self):
+        self.assertWithinBudget(MainView, self.client.get('/'))
+
+    def test_cold_stats_row_is_rebuilt_once(self):
+        # Only the very first request after the row is lost pays for the rebuild.
+        DonationStats.objects.all().delete()
+        self.client.get('/')
+        cache.clear()
+        self.assertWithinBudget(MainView, self.client.get('/'))
+
+    def test_staff_views(self):
+        self.client.force_login(self.staff)
+        for view_class, url in [
+            (DonationView, '/donation/'),
+            (InstitutionSearchView, '/search/?q=fundacja'),
+            (AllDonationView, '/all_donation/'),
+            (AllDonationView, '/all_donation/?history=1'),
+            (PickupPlanView, '/pickups/'),
+            (DonationAnalyticsView, '/analytics/'),
+            (UserDonation, '/my_donation/'),
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(view_class, self.client.get(url))
+
+    def test_token_intake(self):
+        key = create_api_token(self.staff, 'Punkt Kraków')
+        payload = json.dumps({'donations': [{
+            'institution': 'Fundacja 0', 'categories': ['ubrania', 'zabawki'], 'quantity': 2, 'address': 'Długa 1',
+            'phone_number': '123456789', 'city': 'Kraków', 'zip_code': '30-001', 'pick_up_date': '2026-11-02',
+            'pick_up_time': '12:00',
+        } for _ in range(20)]})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/donations/bulk/', payload, content_type='application/json',
+                                        headers={'Authorization': f'Bearer {key}'})
+        self.assertEqual(response.status_code, 201)
+        self.assertWithinBudget(DonationIntakeView, response)
+
+
+class FlakySMTPBackend(BaseEmailBackend):
+    # Stands in for the SMTP backend: refuses to connect while the server is
+    # down, and rejects the recipients it is told to.
+    def __init__(self, down=False, rejected=(), **kwargs):
+        super().__init__(**kwargs)
+        self.down = down
+        self.rejected = set(rejected)
+        self.sent = []
+
+    def open(self):
+        if self.down:
+            raise ConnectionRefusedError('SMTP niedostępny')
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.rejected & set(message.to):
+                raise OSError('odrzucony adresat')
+            self.sent.append(message)
+        return len(messages)
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.emails = [queue_email('Temat', 'Treść', f'osoba{number}@example.com') for number in range(3)]
+
+    def test_locmem_delivery(self):
+        self.assertEqual(deliver_outbox(), (3, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         [email.recipient for email in self.emails])
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+    def test_connection_failure_reschedules_the_batch(self):
+        self.assertEqual(deliver_outbox(connection=FlakySMTPBackend(down=True)), (0, 3))
+        for email in OutboxEmail.objects.all():
+            self.assertEqual(email.status, OutboxEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn('SMTP niedostępny', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+        # Nothing is due again until the backoff has passed.
+        self.assertEqual(deliver_outbox(connection=FlakySMTPBackend()), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        backend = FlakySMTPBackend()
+        self.assertEqual(deliver_outbox(connection=backend), (3, 0))
+        self.assertEqual(len(backend.sent), 3)
+        self.assertEqual(set(OutboxEmail.objects.values_list('attempts', flat=True)), {2})
+
+    def test_rejected_recipient_fails_after_max_attempts(self):
+        backend = FlakySMTPBackend(rejected=['osoba0@example.com'])
+        self.assertEqual(deliver_outbox(max_attempts=2, connection=backend), (2, 1))
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(max_attempts=2, connection=backend), (0, 1))
+        email = OutboxEmail.objects.get(recipient='osoba0@example.com')
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.FAILED, 2))
+
+
+class InstitutionMatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.clothes, self.toys, self.books = [Category.objects.create(name=name)
+                                               for name in ('ubrania', 'zabawki', 'książki')]
+        make_institution('Fundacja Pierwsza').category.set([self.clothes, self.toys])
+        make_institution('Fundacja Druga').category.set([self.toys])
+
+    def match(self, categories):
+        response = self.client.get('/api/institutions/', {'categories': categories})
+        self.assertEqual(response.status_code, 200)
+        return [(institution['name'], institution['overlap']) for institution in response.json()['institutions']]
+
+    def test_matches_by_overlap(self):
+        self.assertEqual(self.match(f'{self.clothes.pk},{self.toys.pk}'),
+                         [('Fundacja Pierwsza', 2), ('Fundacja Druga', 1)])
+
+    def test_no_categories_lists_every_institution(self):
+        self.assertEqual(self.match(''), [('Fundacja Druga', 0), ('Fundacja Pierwsza', 0)])
+
+    def test_unknown_category_matches_nothing(self):
+        # Linked to no institution, so it has no bit in the index.
+        self.assertEqual(self.match(str(self.books.pk)), [])
+        self.assertEqual(self.match(f'{self.books.pk},{self.clothes.pk}'), [('Fundacja Pierwsza', 1)])
+
+    def test_huge_ids_are_ignored(self):
+        self.assertEqual(self.match(f'{10 ** 17},{self.clothes.pk}'), [('Fundacja Pierwsza', 1)])
+        self.assertEqual(self.match('9' * 5000), [('Fundacja Druga', 0), ('Fundacja Pierwsza', 0)])
+
+    def test_number_of_ids_is_capped(self):
+        filler = ','.join(str(10 ** 6 + n) for n in range(100))
+        self.assertEqual(self.match(f'{filler},{self.clothes.pk}'), [])
+
+
+class DonationRollupTest(TestCase):
+    # Whatever path changed the donations, the incrementally kept rollups must
+    # equal a fresh backfill.
+    def setUp(self):
+        self.clothes, self.toys, self.books = [Category.objects.create(name=name)
+                                               for name in ('ubrania', 'zabawki', 'książki')]
+        self.first = make_institution('Fundacja Pierwsza')
+        self.second = make_institution('Fundacja Druga')
+
+    def rollups(self):
+        return {(rollup.day, rollup.institution_id, rollup.category_id):
+                tuple(getattr(rollup, field) for field in ROLLUP_FIELDS)
+                for rollup in DonationRollup.objects.exclude(donations=0)}
+
+    def assertMatchesBackfill(self):
+        kept = self.rollups()
+        rebuild_rollups(*donation_date_range())
+        self.assertEqual(kept, self.rollups())
+
+    def test_intake(self):
+        create_donations([{
+            'institution': institution, 'categories': categories, 'quantity': quantity, 'address': 'Długa 1',
+            'phone_number': '123456789', 'city': 'Kraków', 'zip_code': '30-001', 'pick_up_date': day,
+            'pick_up_time': '12:00',
+        } for institution, categories, quantity, day in [
+            ('Fundacja Pierwsza', ['ubrania', 'zabawki'], 2, '2026-11-02'),
+            ('Fundacja Pierwsza', ['ubrania'], 3, '2026-11-02'),
+            ('Fundacja Druga', ['książki'], 1, '2026-11-03'),
+        ]])
+        self.assertEqual(self.rollups()[date(2026, 11, 2), self.first.pk, self.clothes.pk], (2, 5, 0, 0))
+        self.assertMatchesBackfill()
+
+    def test_mark_taken(self):
+        donations = [make_donation(self.first, [self.clothes, self.toys], quantity=quantity)
+                     for quantity in (1, 2, 3)]
+        make_donation(self.second, [self.books])
+        mark_donations_taken(Donation.objects.filter(pk__in=[donations[0].pk, donations[1].pk]))
+        # Already taken rows are not counted twice.
+        mark_donations_taken(Donation.objects.filter(pk=donations[0].pk))
+        self.assertEqual(self.rollups()[date(2026, 11, 2), self.first.pk, self.clothes.pk], (3, 6, 2, 3))
+        self.assertMatchesBackfill()
+
+    def test_category_edits(self):
+        donation = make_donation(self.first, [self.clothes])
+        other = make_donation(self.second, [self.toys])
+        donation.categories.add(self.toys)
+        donation.categories.add(self.toys)
+        donation.categories.remove(self.books)
+        donation.categories.remove()
+        donation.categories.set([self.books, self.toys])
+        self.books.donation_set.add(other)
+        self.books.donation_set.remove(donation, donation)
+        self.clothes.donation_set.remove(other)
+        other.categories.clear()
+        self.assertMatchesBackfill()
+        self.assertEqual(set(self.rollups()), {(date(2026, 11, 2), self.first.pk, self.toys.pk)})
+
+    def test_donation_edits_and_deletes(self):
+        donation = make_donation(self.first, [self.clothes, self.toys])
+        make_donation(self.second, [self.toys])
+        donation.quantity = 5
+        donation.pick_up_date = date(2026, 11, 9)
+        donation.institution = self.second
+        donation.save()
+        self.assertMatchesBackfill()
+        donation.delete()
+        self.assertMatchesBackfill()
+
+    def test_many_keys_are_locked_in_batches(self):
+        days = [date(2026, 1, 1) + timedelta(days=n) for n in range(LOCK_BATCH_SIZE + 10)]
+        deltas = {(day, self.first.pk, self.clothes.pk): {'donations': 1, 'bags': 2} for day in days}
+        apply_rollup_deltas(deltas)
+        apply_rollup_deltas(deltas)
+        self.assertEqual(set(self.rollups().values()), {(2, 4, 0, 0)})
+        self.assertEqual(len(self.rollups()), len(days))
+
+
+class PickupDigestTest(TestCase):
+    day = date(2026, 11, 1)
+
+    def setUp(self):
+        self.first = make_institution('Fundacja Pierwsza', email='pierwsza@example.com')
+        self.second = make_institution('Fundacja Druga', email='druga@example.com')
+        self.silent = make_institution('Fundacja Bez Adresu', email='')
+        make_donation(self.first, quantity=2)
+        make_donation(self.first, quantity=3)
+        make_donation(self.first, quantity=1, city='Warszawa', pick_up_date=date(2026, 11, 5))
+        make_donation(self.first, quantity=7, is_taken=True)
+        make_donation(self.first, quantity=7, pick_up_date=date(2026, 12, 1))
+        make_donation(self.second, quantity=4)
+        make_donation(self.silent, quantity=5)
+
+    def test_pickups_are_grouped_per_institution(self):
+        digests = {digest['name']: digest for digest in build_digests(self.day)}
+        self.assertEqual(set(digests), {'Fundacja Pierwsza', 'Fundacja Druga'})
+        first = digests['Fundacja Pierwsza']
+        self.assertEqual((first['donations'], first['bags']), (3, 6))
+        self.assertEqual([(row['pick_up_date'], row['city'], row['donations'], row['bags'])
+                          for row in first['pickups']],
+                         [(date(2026, 11, 2), 'Kraków', 2, 5), (date(2026, 11, 5), 'Warszawa', 1, 1)])
+
+    def test_sends_one_digest_per_institution_with_email(self):
+        self.assertEqual(send_pickup_digests(self.day), 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['druga@example.com', 'pierwsza@example.com'])
+        self.assertFalse(PickupDigest.objects.filter(institution=self.silent).exists())
+        self.assertEqual(PickupDigest.objects.values_list('donations', 'bags').get(institution=self.first), (3, 6))
+
+    def test_one_digest_per_day(self):
+        send_pickup_digests(self.day)
+        self.assertEqual(send_pickup_digests(self.day), 0)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(send_pickup_digests(self.day + timedelta(days=1)), 2)
+
+    def test_racing_run_does_not_send_twice(self):
+        digest = next(digest for digest in build_digests(self.day) if digest['institution_id'] == self.first.pk)
+        PickupDigest.objects.create(institution=self.first, day=self.day)
+        self.assertEqual(send_digest(digest, get_template('pickup_digest_email.html'), self.day, 7,
+                                     mail.get_connection()), 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_only_sent_digests_are_recorded(self):
+        # Institutions go out in id order, so the first digest is sent before
+        # the second one fails.
+        backend = FlakySMTPBackend(rejected=['druga@example.com'])
+        with self.assertRaises(OSError):
+            send_pickup_digests(self.day, connection=backend)
+        self.assertEqual([message.to for message in backend.sent], [['pierwsza@example.com']])
+        self.assertEqual(list(PickupDigest.objects.values_list('institution', flat=True)), [self.first.pk])
+        self.assertEqual(send_pickup_digests(self.day), 1)
+        self.assertEqual(mail.outbox[0].to, ['druga@example.com'])
+
+
+class EmailCaseTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('darczynca@example.com', password='Haslo123!')
+
+    def test_login_ignores_email_case(self):
+        self.assertEqual(authenticate(username='Darczynca@Example.COM', password='Haslo123!'), self.user)
+        response = self.client.post('/login/', {'login': ' DARCZYNCA@example.com ', 'password': 'Haslo123!'})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_registration_rejects_email_differing_in_case(self):
+        response = self.client.post('/registration/', {
+            'username': 'Darczynca@Example.com', 'password': 'Haslo123!', 'password_confirmation': 'Haslo123!',
+            'first_name': 'Anna', 'last_name': 'Nowak',
+        })
+        self.assertContains(response, 'Ten email jest już używany.')
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_registration_stores_lowercase_email(self):
+        self.client.post('/registration/', {
+            'username': 'Nowa@Example.com', 'password': 'Haslo123!', 'password_confirmation': 'Haslo123!',
+            'first_name': 'Anna', 'last_name': 'Nowak',
+        })
+        self.assertTrue(User.objects.filter(username='nowa@example.com').exists())
+
+    def test_migration_refuses_case_collisions(self):
+        migration = import_module('PortfolioLab_app.migrations.0017_user_username_lower')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX {migration.INDEX_NAME}')
+        User.objects.create_user('Darczynca@example.com', password='Haslo123!')
+        with self.assertRaisesMessage(RuntimeError, 'darczynca@example.com'):
+            migration.create_username_lower_index(apps, connection.schema_editor())
+
+
+class DonationExportTest(TestCase):
+    def setUp(self):
+        clothes, toys = Category.objects.create(name='ubrania'), Category.objects.create(name='zabawki')
+        self.first = make_institution('Fundacja Pierwsza')
+        self.open = make_donation(self.first, [clothes, toys], quantity=3)
+        self.taken = make_donation(make_institution('Fundacja Druga'), [toys], is_taken=True,
+                                   pick_up_date=date(2020, 1, 1))
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+        # Pinned to the primary, where the test rows are.
+        self.client.cookies[PIN_COOKIE] = '1'
+
+    def export(self, **params):
+        response = self.client.get('/all_donation/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(self.export().splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [self.open.pk, self.taken.pk])
+        self.assertEqual((rows[0]['institution'], rows[0]['categories'], rows[0]['quantity']),
+                         ('Fundacja Pierwsza', 'ubrania, zabawki', '3'))
+
+    def test_jsonl_with_filters(self):
+        rows = [json.loads(line) for line in self.export(format='jsonl', is_taken='0').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.open.pk])
+        self.assertEqual(rows[0]['pick_up_date'], '2026-11-02')
+        self.assertEqual(self.export(format='jsonl', institution=self.first.pk, is_taken='1'), '')
+
+    def test_history_exports_archived_donations(self):
+        archive_batch(date(2021, 1, 1))
+        rows = list(csv.DictReader(self.export(history='1').splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [self.taken.pk])
+
+    def test_rejects_unknown_format_and_bad_filters(self):
+        self.assertEqual(self.client.get('/all_donation/export/', {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get('/all_donation/export/', {'date_from': 'wczoraj'}).status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user('darczynca@example.com', password='Haslo123!'))
+        self.assertEqual(self.client.get('/all_donation/export/').status_code, 403)
+
+
+class DonationBulkTakeTest(TestCase):
+    def setUp(self):
+        self.toys = Category.objects.create(name='zabawki')
+        institution = make_institution('Fundacja Pierwsza')
+        self.krakow = [make_donation(institution, [self.toys], quantity=n) for n in (1, 2)]
+        self.warsaw = make_donation(institution, [self.toys], city='Warszawa', quantity=4)
+        self.later = make_donation(institution, [self.toys], pick_up_date=date(2026, 11, 3))
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+
+    def take(self, data):
+        return self.client.post('/all_donation/take/', data, headers={'Accept': 'application/json'})
+
+    def taken_ids(self):
+        return set(Donation.objects.filter(is_taken=True).values_list('pk', flat=True))
+
+    def test_takes_selected_donations(self):
+        response = self.take({'donation_ids': [self.krakow[0].pk, self.warsaw.pk]})
+        self.assertEqual(response.json(), {'updated': 2})
+        self.assertEqual(self.taken_ids(), {self.krakow[0].pk, self.warsaw.pk})
+        # Taken donations are not counted again.
+        self.assertEqual(self.take({'donation_ids': [self.krakow[0].pk]}).json(), {'updated': 0})
+
+    def test_takes_a_day_in_one_city(self):
+        self.assertEqual(self.take({'pick_up_date': '2026-11-02', 'city': 'Kraków'}).json(), {'updated': 2})
+        self.assertEqual(self.taken_ids(), {donation.pk for donation in self.krakow})
+        rollup = DonationRollup.objects.get(day=date(2026, 11, 2), category=self.toys)
+        self.assertEqual((rollup.taken_donations, rollup.taken_bags), (2, 3))
+
+    def test_requires_ids_or_date(self):
+        response = self.take({'city': 'Kraków'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('__all__', response.json()['errors'])
+        self.assertEqual(self.take({'donation_ids': ['abc']}).status_code, 400)
+        self.assertEqual(self.taken_ids(), set())
+
+    def test_form_post_redirects_with_message(self):
+        response = self.client.post('/all_donation/take/', {'pick_up_date': '2026-11-03'}, follow=True)
+        self.assertRedirects(response, '/all_donation/')
+        self.assertContains(response, 'Oznaczono jako odebrane: 1')
+
+
+class PickupPlanTest(TestCase):
+    def setUp(self):
+        institution = make_institution('Fundacja Pierwsza')
+        for city, zip_code, hour, quantity in [
+            ('Kraków', '30-001', 9, 2), ('Kraków', '30-150', 9, 3), ('Kraków', '31-100', 9, 1),
+            ('Kraków', '30-001', 14, 4), ('Gdańsk', '80-001', 8, 5),
+        ]:
+            make_donation(institution, city=city, zip_code=zip_code, pick_up_time=time(hour, 30), quantity=quantity)
+        make_donation(institution, is_taken=True, quantity=10)
+        make_donation(institution, pick_up_date=date(2026, 11, 3), quantity=10)
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+
+    def test_groups_by_city_postcode_prefix_and_hour(self):
+        response = self.client.get('/pickups/', {'date': '2026-11-02', 'format': 'json'})
+        groups = response.json()['groups']
+        self.assertEqual([(group['city'], group['zip_prefix'], group['bags'], group['donations']) for group in groups],
+                         [('Gdańsk', '80', 5, 1), ('Kraków', '30', 9, 3), ('Kraków', '31', 1, 1)])
+        self.assertEqual(groups[1]['windows'], [
+            {'start': '09:00', 'end': '10:00', 'bags': 5, 'donations': 2},
+            {'start': '14:00', 'end': '15:00', 'bags': 4, 'donations': 1},
+        ])
+
+    def test_html_plan_totals_bags(self):
+        response = self.client.get('/pickups/', {'date': '2026-11-02'})
+        self.assertEqual(response.context['total_bags'], 15)
+        self.assertEqual(self.client.get('/pickups/', {'date': 'jutro'}).context['pick_up_date'], date.today())
+
+
+@override_settings(ROOT_URLCONF='PortfolioLab.async_urls')
+class AsyncViewsTest(TestCase):
+    # The test client runs the async views through the sync handler, which
+    # awaits them like the ASGI one does.
+    def setUp(self):
+        cache.clear()
+        toys = Category.objects.create(name='zabawki')
+        institution = make_institution('Fundacja Pierwsza', type=1)
+        institution.category.set([toys])
+        self.donor = User.objects.create_user('darczynca@example.com', password='Haslo123!')
+        self.donations = [make_donation(institution, [toys], user=self.donor, quantity=n,
+                                        pick_up_date=date(2026, 11, n)) for n in range(1, 4)]
+        make_donation(institution, [toys], quantity=10)
+        self.client.cookies[PIN_COOKIE] = '1'
+
+    def test_home_page_matches_sync_view(self):
+        response = self.client.get('/')
+        self.assertEqual(response.context['total_quantity'], 16)
+        self.assertEqual(response.context['all_institution'], 1)
+        self.assertEqual([institution['name'] for institution in response.context['help_institution_fundacja']],
+                         ['Fundacja Pierwsza'])
+
+    def test_user_donations(self):
+        self.assertRedirects(self.client.get('/my_donation/'), '/login/?next=/my_donation/',
+                             fetch_redirect_response=False)
+        self.client.force_login(self.donor)
+        response = self.client.get('/my_donation/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['total_quantity'], response.context['donation_count']), (6, 3))
+        self.assertEqual([donation.pk for donation in response.context['page'].object_list],
+                         [donation.pk for donation in self.donations])
+
+    def test_institution_list_is_staff_only(self):
+        self.client.force_login(self.donor)
+        self.assertEqual(self.client.get('/institution/').status_code, 403)
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+        self.assertContains(self.client.get('/institution/'), 'Fundacja Pierwsza')
+
+    def test_institution_matches_use_etag(self):
+        response = self.client.get('/api/institutions/', {'categories': '1,2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        cached = self.client.get('/api/institutions/', {'categories': '2,1'},
+                                 headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+
+@override_settings(THROTTLE_RULES={'login': {'ip': (3, 60), 'username': (2, 300)}})
+class ThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username='darczynca@example.com', ip='10.0.0.1'):
+        return self.client.post('/login/', {'login': username, 'password': 'zle'}, REMOTE_ADDR=ip)
+
+    def test_blocks_ip_over_limit(self):
+        for number in range(3):
+            self.assertEqual(self.login(f'osoba{number}@example.com').status_code, 302)
+        response = self.login('nowa@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+        self.assertEqual(self.login('nowa@example.com', ip='10.0.0.2').status_code, 302)
+
+    def test_blocks_username_across_ips_ignoring_case(self):
+        self.login(ip='10.0.0.1')
+        self.login('Darczynca@Example.com', ip='10.0.0.2')
+        self.assertEqual(self.login(' DARCZYNCA@example.com', ip='10.0.0.3').status_code, 429)
+
+    def test_sliding_window(self):
+        with mock.patch('PortfolioLab_app.throttle.time.time', return_value=600.0):
+            for _ in range(3):
+                self.assertEqual(check_throttle('login', '10.0.0.1'), 0)
+            self.assertEqual(check_throttle('login', '10.0.0.1'), 60)
+        # Half of the previous window still counts: 1.5 + 1 is under the limit,
+        # 1.5 + 2 is not.
+        with mock.patch('PortfolioLab_app.throttle.time.time', return_value=690.0):
+            self.assertEqual(check_throttle('login', '10.0.0.1'), 0)
+            self.assertEqual(check_throttle('login', '10.0.0.1'), 0)
+            self.assertEqual(check_throttle('login', '10.0.0.1'), 30)
+        with mock.patch('PortfolioLab_app.throttle.time.time', return_value=720.0):
+            self.assertEqual(check_throttle('login', '10.0.0.1'), 0)
+
+    def test_stats_count_allowed_and_blocked(self):
+        for number in range(4):
+            self.login(f'osoba{number}@example.com', ip='10.0.0.9')
+        self.client.force_login(User.objects.create_user('admin@example.com', password='Haslo123!', is_staff=True))
+        response = self.client.get('/api/throttle/')
+        self.assertEqual(response.json()['scopes'], {'login': {'allowed': 3, 'blocked': 1}})
+
+
+class InstitutionSearchIndexTest(TestCase):
+    def setUp(self):
+        self.shelter = make_institution('Schronisko Azyl', description='pomoc dla zwierząt')
+        self.library = make_institution('Biblioteka Dzielnicowa', description='książki dla schroniska')
+
+    def search(self, query):
+        return [institution.name for institution in search_institutions(query).order_by('-rank', 'name')]
+
+    def test_matches_every_word_as_prefix(self):
+        self.assertEqual(self.search('schron'), ['Schronisko Azyl', 'Biblioteka Dzielnicowa'])
+        self.assertEqual(self.search('schron ksi'), ['Biblioteka Dzielnicowa'])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_query_without_words_finds_nothing(self):
+        self.client.cookies[PIN_COOKIE] = '1'
+        response = self.client.get('/search/', {'q': '!!!', 'format': 'json'})
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_saved_institution_is_reindexed(self):
+        self.shelter.name = 'Przytulisko Azyl'
+        self.shelter.save()
+        self.assertEqual(self.search('przytul'), ['Przytulisko Azyl'])
+        self.assertEqual(self.search('schron'), ['Biblioteka Dzielnicowa'])
+
+    def test_deleted_institution_is_removed(self):
+        self.shelter.delete()
+        self.assertEqual(self.search('azyl'), [])
+
+    def test_rebuild_picks_up_bulk_updates(self):
+        # update() skips the save signals, so the index lags until a rebuild.
+        Institution.objects.filter(pk=self.library.pk).update(name='Czytelnia Dzielnicowa')
+        self.assertEqual(self.search('czytelnia'), [])
+        rebuild_search_index()
+        self.assertEqual(self.search('czytelnia'), ['Czytelnia Dzielnicowa'])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        institution = make_institution('Fundacja Pierwsza')
+        for _ in range(3):
+            make_donation(institution)
+
+    def count(self, estimate):
+        with mock.patch('PortfolioLab_app.pagination.estimated_count', return_value=estimate):
+            return EstimatedCountPaginator(Donation.objects.order_by('pk'), 2).count
+
+    def test_no_estimate_outside_postgresql(self):
+        self.assertIsNone(estimated_count(Donation.objects.all()))
+        self.assertEqual(EstimatedCountPaginator(Donation.objects.order_by('pk'), 2).count, 3)
+
+    def test_small_estimates_are_counted_exactly(self):
+        self.assertEqual(self.count(None), 3)
+        self.assertEqual(self.count(EXACT_COUNT_LIMIT - 1), 3)
+
+    def test_large_estimates_are_used(self):
+        paginator = EstimatedCountPaginator(Donation.objects.order_by('pk'), 50)
+        with mock.patch('PortfolioLab_app.pagination.estimated_count', return_value=EXACT_COUNT_LIMIT * 5):
+            self.assertEqual(paginator.count, EXACT_COUNT_LIMIT * 5)
+            self.assertEqual(paginator.num_pages, 1000)
+
+    def test_lists_are_counted_exactly(self):
+        self.assertEqual(EstimatedCountPaginator(list(range(7)), 2).count, 7)
+
+    def test_admin_changelist(self):
+        self.client.force_login(User.objects.create_superuser('admin@example.com', password='Haslo123!'))
+        response = self.client.get('/admin/PortfolioLab_app/donation/')
+        self.assertEqual(response.context['cl'].result_count, 3)
@@ -0,0 +1,98 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+STATS_KEY = 'throttle:stats:{scope}:{outcome}'
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _key(scope, kind, value):
+    digest = hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+    return f'throttle:{scope}:{kind}:{digest}'
+
+
+def _estimate(key, period, now):
+    # Sliding window counter: the previous fixed window counts in proportion
+    # to how much of it still overlaps the last ``period`` seconds.
+    window = int(now // period)
+    counts = cache.get_many([f'{key}:{window}', f'{key}:{window - 1}'])
+    elapsed = now - window * period
+    estimate = counts.get(f'{key}:{window - 1}', 0) * (period - elapsed) / period + counts.get(f'{key}:{window}', 0)
+    return estimate, math.ceil(period - elapsed)
+
+
+def _record(key, period, now):
+    window_key = f'{key}:{int(now // period)}'
+    cache.add(window_key, 0, period * 2)
+    try:
+        cache.incr(window_key)
+    except ValueError:
+        cache.set(window_key, 1, period * 2)
+
+
+def _count(scope, outcome):
+    key = STATS_KEY.format(scope=scope, outcome=outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def check_throttle(scope, ip, username=None):
+    """Record an attempt and return 0, or the seconds to wait if it is over a limit."""
+    rules = settings.THROTTLE_RULES.get(scope, {})
+    values = {'ip': ip, 'username': username}
+    now = time.time()
+    limits = [(_key(scope, kind, values[kind]), limit, period)
+              for kind, (limit, period) in rules.items() if values.get(kind)]
+
+    retry_after = 0
+    for key, limit, period in limits:
+        estimate, wait = _estimate(key, period, now)
+        if estimate >= limit:
+            retry_after = max(retry_after, wait)
+    if retry_after:
+        _count(scope, 'blocked')
+        return retry_after
+
+    for key, limit, period in limits:
+        _record(key, period, now)
+    _count(scope, 'allowed')
+    return 0
+
+
+def throttle_stats():
+    keys = {(scope, outcome): STATS_KEY.format(scope=scope, outcome=outcome)
+            for scope in settings.THROTTLE_RULES for outcome in ('allowed', 'blocked')}
+    counts = cache.get_many(keys.values())
+    return {
+        scope: {outcome: counts.get(keys[scope, outcome], 0) for outcome in ('allowed', 'blocked')}
+        for scope in settings.THROTTLE_RULES
+    }
+
+
+def throttle(scope, username_field=None):
+    # Runs before the view body, so a rejected attempt costs a couple of
+    # cache reads instead of a password hash or an email.
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            username = request.POST.get(username_field) if username_field else None
+            retry_after = check_throttle(scope, client_ip(request), username)
+            if retry_after:
+                response = HttpResponse(f'Zbyt wiele prób. Spróbuj ponownie za {retry_after} s.', status=429,
+                                        content_type='text/plain; charset=utf-8')
+                response['Retry-After'] = str(retry_after)
+                return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
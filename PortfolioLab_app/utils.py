@@ -3,7 +3,8 @@ from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from django.contrib.auth.tokens import default_token_generator as token_generator
-from django.core.mail import EmailMessage
+
+from .outbox import queue_email
 
 
 def send_email_verify(request, user):
@@ -18,12 +19,7 @@ def send_email_verify(request, user):
     message = render_to_string(
         'verify_email.html', context=context
     )
-    email = EmailMessage(
-        'Verify email',
-        message,
-        to=[user.username],
-    )
-    email.send()
+    queue_email('Verify email', message, user.username)
 
 
 def send_email_reset_password(request, user):
@@ -38,9 +34,4 @@ def send_email_reset_password(request, user):
     message = render_to_string(
         'reset_password_email.html', context=context
     )
-    email = EmailMessage(
-        'Verify email',
-        message,
-        to=[user.username],
-    )
-    email.send()
+    queue_email('Verify email', message, user.username)
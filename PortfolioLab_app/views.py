@@ -1,5 +1,8 @@
-from datetime import datetime
-from django.db import IntegrityError
+import json
+from datetime import date, datetime, timedelta
+from django.db import IntegrityError, router
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash, get_user_model
 from django.contrib.auth.backends import UserModel
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -7,52 +10,64 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.utils.encoding import force_str
-from django.db.models import Max
-from django.http import HttpResponseServerError
+from django.db.models import Count, Sum
+from django.http import HttpResponseBadRequest, HttpResponseServerError, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
-from django.utils.http import urlsafe_base64_decode
+from django.utils.http import urlencode, urlsafe_base64_decode
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import etag
 from django.contrib.auth.tokens import default_token_generator as token_generator, default_token_generator
 
 from .models import Category, Donation, Institution
 from django.views.generic import CreateView, DeleteView, UpdateView
 from .forms import InstitutionForm, RegistrationForm, LoginForm, CategoryForm, DonationUpdateForm, \
-    UserUpdateForm, ResetPasswordForm, SearchUserForm
+    UserUpdateForm, ResetPasswordForm, SearchUserForm, DonationFilterForm, \
+    DonationBulkTakeForm, InstitutionSearchForm, RollupFilterForm
+from .api_auth import csrf_failure, token_from_request
+from .archive import donation_model
+from .backends import users_by_email
+from .catalogue import get_institution_catalogue
+from .category_index import get_category_index
+from .exports import EXPORT_FORMATS, stream_export
+from .intake import create_donations
+from .pagination import keyset_paginate
+from .pickups import donations_to_take, mark_donations_taken, pickup_plan
+from .rollups import ROLLUP_FIELDS, weekly_rollups
+from . import template_profiler
+from .stats import get_donation_stats
+from .throttle import throttle, throttle_stats
 from .utils import send_email_verify, send_email_reset_password
 
 
 # Create your views here.
 
 class MainView(View):
-    def get(self, request):
-        all_donation = Donation.objects.all()
-        total_quantity = sum(donation.quantity for donation in all_donation)
-        all_institution = Institution.objects.aggregate(Max('id'))['id__max']
-
-        page = request.GET.get('page')
-
-        institution_fundacja = Institution.objects.filter(type=1).order_by('name')
-        paginator_help_institution_fundacja = Paginator(institution_fundacja, 5)
-        help_institution_fundacja = paginator_help_institution_fundacja.get_page(page)
+    # No read_replica here: the page is cached right after a write purges it,
+    # which is when the replica is most likely to be behind.
+    query_budget = 6
 
-        institution_organizacja = Institution.objects.filter(type=2).order_by('name')
-        paginator_help_institution_organizacja = Paginator(institution_organizacja, 5)
-        help_institution_organizacja = paginator_help_institution_organizacja.get_page(page)
-
-        institution_zbiorka = Institution.objects.filter(type=3).order_by('name')
-        paginator_help_institution_zbiorka = Paginator(institution_zbiorka, 5)
-        help_institution_zbiorka = paginator_help_institution_zbiorka.get_page(page)
+    def get(self, request):
+        context = self.get_context(get_donation_stats(), get_institution_catalogue(), request.GET.get('page'))
+        return render(request, 'index.html', context)
 
-        context = {
-            'total_quantity': total_quantity,
-            'all_institution': all_institution,
+    @staticmethod
+    def get_context(stats, catalogue, page):
+        help_institution_fundacja = Paginator(catalogue[1], 5).get_page(page)
+        help_institution_organizacja = Paginator(catalogue[2], 5).get_page(page)
+        help_institution_zbiorka = Paginator(catalogue[3], 5).get_page(page)
+
+        return {
+            'total_quantity': stats.total_quantity,
+            'all_institution': stats.supported_institutions,
             'help_institution_fundacja': help_institution_fundacja,
             'help_institution_organizacja': help_institution_organizacja,
             'help_institution_zbiorka': help_institution_zbiorka
 
         }
-        return render(request, 'index.html', context)
 
 
 class StaffRequiredMixin(UserPassesTestMixin, LoginRequiredMixin):
@@ -60,6 +75,29 @@ class StaffRequiredMixin(UserPassesTestMixin, LoginRequiredMixin):
         return self.request.user.is_staff
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class ApiTokenMixin:
+    # Machine clients send "Authorization: Bearer <key>" and skip CSRF; any
+    # other request goes through the CSRF check and the usual staff test.
+
+    def dispatch(self, request, *args, **kwargs):
+        if 'Authorization' in request.headers:
+            token = token_from_request(request)
+            if token is None:
+                return JsonResponse({'error': 'Nieprawidłowy token API'}, status=401)
+            request.user = token.user
+            request.api_token = token
+        else:
+            rejected = csrf_failure(request)
+            if rejected is not None:
+                return rejected
+        return super().dispatch(request, *args, **kwargs)
+
+    def test_func(self):
+        return getattr(self.request, 'api_token', None) is not None or super().test_func()
+
+
+@method_decorator(throttle('login', 'login'), name='post')
 class LoginView(View):
     def get(self, request):
         form = LoginForm
@@ -76,6 +114,7 @@ class LoginView(View):
                 return redirect('registration')
 
 
+@method_decorator(throttle('registration'), name='post')
 class RegistrationView(View):
     def get(self, request):
         form = RegistrationForm
@@ -164,6 +203,8 @@ def logout_view(request):
 
 
 class UserInfoView(LoginRequiredMixin, View):
+    read_replica = True
+
     def get(self, request, user_id):
         users = User.objects.filter(id=user_id)
         context = {
@@ -172,6 +213,7 @@ class UserInfoView(LoginRequiredMixin, View):
         return render(request, 'UserInfo.html', context)
 
 
+@method_decorator(throttle('reset', 'username'), name='post')
 class ResetPasswordSearchUserView(View):
     def get(self, request):
         form = SearchUserForm()
@@ -185,7 +227,7 @@ class ResetPasswordSearchUserView(View):
         if form.is_valid():
             username = form.cleaned_data['username']
             try:
-                user = User.objects.get(username=username)
+                user = users_by_email(username).get()
                 send_email_reset_password(request, user)
                 return redirect('confirm_email')
             except User.DoesNotExist:
@@ -194,6 +236,7 @@ class ResetPasswordSearchUserView(View):
             return render(request, 'reset_password.html', {'form': form})
 
 
+@method_decorator(throttle('reset'), name='post')
 class ResetPasswordView(View):
     def get(self, request, uidb64, token):
         user = self.get_user(uidb64)
@@ -237,9 +280,11 @@ class ResetPasswordView(View):
 
 
 class DonationView(LoginRequiredMixin, View):
+    query_budget = 12
+
     def get(self, request):
         all_category = Category.objects.all()
-        all_institution = Institution.objects.all()
+        all_institution = get_category_index().match([])
         context = {
             'all_category': all_category,
             'all_institution': all_institution,
@@ -248,39 +293,250 @@ class DonationView(LoginRequiredMixin, View):
 
     def post(self, request):
         try:
-            institution_name = request.POST.get('organization')
-            institution = Institution.objects.get(name=institution_name)
-            categories_names = request.POST.getlist('categories')
-            categories_ids = []
-            for category_name in categories_names:
-                category = Category.objects.get(name=category_name)
-                categories_ids.append(category.id)
-            quantity = request.POST.get('bags')
-            address = request.POST.get('address')
-            phone_number = request.POST.get('phone')
-            city = request.POST.get('city')
-            zip_code = request.POST.get('postcode')
-            pick_up_date_str = request.POST.get('data')
-            pick_up_date = datetime.strptime(pick_up_date_str, '%Y-%m-%d').date()
-            pick_up_time = request.POST.get('time')
-            pick_up_comment = request.POST.get('more_info')
-            new_donation = Donation.objects.create(quantity=quantity, institution=institution,
-                                                   address=address, phone_number=phone_number, city=city,
-                                                   zip_code=zip_code, pick_up_date=pick_up_date,
-                                                   pick_up_time=pick_up_time,
-                                                   pick_up_comment=pick_up_comment, user=request.user)
-
-            new_donation.save()
+            row = {
+                'institution': request.POST.get('organization'),
+                'categories': request.POST.getlist('categories'),
+                'quantity': request.POST.get('bags'),
+                'address': request.POST.get('address'),
+                'phone_number': request.POST.get('phone'),
+                'city': request.POST.get('city'),
+                'zip_code': request.POST.get('postcode'),
+                'pick_up_date': request.POST.get('data'),
+                'pick_up_time': request.POST.get('time'),
+                'pick_up_comment': request.POST.get('more_info'),
+            }
+            result = create_donations([row], user=request.user)
+            if result.errors:
+                return HttpResponseBadRequest('Nieprawidłowe dane formularza')
             return render(request, 'form-confirmation.html')
         except Exception:
             return HttpResponseServerError('Coś poszło nie tak, sprobój pózniej')
 
 
+class DonationIntakeView(ApiTokenMixin, StaffRequiredMixin, View):
+    query_budget = 12
+    max_rows = 1000
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Nieprawidłowy JSON'}, status=400)
+        rows = payload.get('donations') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return JsonResponse({'error': 'Oczekiwano listy darów'}, status=400)
+        if len(rows) > self.max_rows:
+            return JsonResponse({'error': f'Maksymalnie {self.max_rows} darów w jednym żądaniu'}, status=400)
+
+        result = create_donations(rows, user=request.user)
+        status = 400 if result.errors and not result.donations else 201
+        return JsonResponse(result.as_json(), status=status)
+
+
+MAX_MATCH_CATEGORIES = 50
+
+
+def parse_category_ids(request):
+    # The ids end up in the ETag and in the mask lookup, so only a bounded
+    # number of plausible ones is taken from the query string.
+    values = [pk.strip() for pk in request.GET.get('categories', '').split(',')[:MAX_MATCH_CATEGORIES]]
+    return sorted({int(pk) for pk in values if pk.isdecimal() and len(pk) <= 18})
+
+
+def match_etag(version, category_ids):
+    return f'{version}-{".".join(map(str, category_ids))}'
+
+
+def institution_match_etag(request):
+    return match_etag(get_category_index().version, parse_category_ids(request))
+
+
+@method_decorator([cache_control(public=True, max_age=60), etag(institution_match_etag)], name='get')
+class InstitutionMatchView(View):
+    read_replica = True
+
+    def get(self, request):
+        return JsonResponse({'institutions': get_category_index().match(parse_category_ids(request))})
+
+
+class InstitutionSearchView(View):
+    query_budget = 6
+    read_replica = True
+    paginate_by = 10
+
+    def get(self, request):
+        form = InstitutionSearchForm(request.GET)
+        page = None
+        if form.is_valid() and form.cleaned_data['q']:
+            results = form.search().prefetch_related('category')
+            page = Paginator(results, self.paginate_by).get_page(request.GET.get('page'))
+
+        if request.GET.get('format') == 'json':
+            if page is None:
+                return JsonResponse({'errors': form.errors.get_json_data(), 'count': 0, 'results': []},
+                                    status=400 if form.errors else 200)
+            return JsonResponse({
+                'count': page.paginator.count,
+                'page': page.number,
+                'num_pages': page.paginator.num_pages,
+                'results': [{
+                    'id': institution.id,
+                    'name': institution.name,
+                    'description': institution.description,
+                    'type': institution.get_type_display(),
+                    'categories': [category.name for category in institution.category.all()],
+                    'rank': institution.rank,
+                } for institution in page],
+            })
+
+        params = {key: value for key, value in request.GET.items() if key != 'page' and value}
+        context = {
+            'form': form,
+            'page': page,
+            'query': filter_query(**params),
+        }
+        return render(request, 'search.html', context)
+
+
+def is_taken_filter(request):
+    return {'0': False, '1': True}.get(request.GET.get('is_taken'))
+
+
+def history_filter(request):
+    return request.GET.get('history') == '1'
+
+
+def filter_query(**params):
+    params = {key: value for key, value in params.items() if value is not None}
+    return urlencode(params) + '&' if params else ''
+
+
 class AllDonationView(StaffRequiredMixin, View):
+    query_budget = 6
+    paginate_by = 50
+
+    def get(self, request):
+        is_taken = is_taken_filter(request)
+        history = history_filter(request)
+        donations = (donation_model(history).objects
+                     .select_related('user', 'institution').prefetch_related('categories'))
+        if is_taken is not None:
+            donations = donations.filter(is_taken=is_taken)
+        page = keyset_paginate(donations, request.GET.get('cursor'), self.paginate_by)
+
+        context = {
+            'page': page,
+            'is_taken': is_taken,
+            'history': history,
+            'filter_query': filter_query(history=1 if history else None,
+                                         is_taken=None if is_taken is None else int(is_taken)),
+            'date_now': datetime.now().date(),
+        }
+        return render(request, 'all_donations.html', context)
+
+
+class DonationBulkTakeView(StaffRequiredMixin, View):
+    def post(self, request):
+        form = DonationBulkTakeForm(request.POST)
+        wants_json = 'application/json' in request.headers.get('Accept', '')
+        if not form.is_valid():
+            if wants_json:
+                return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+            messages.error(request, ' '.join(form.errors.get('__all__', ['Nieprawidłowe dane.'])))
+            return redirect('all_donation')
+
+        updated = mark_donations_taken(donations_to_take(**form.cleaned_data))
+        if wants_json:
+            return JsonResponse({'updated': updated})
+        messages.success(request, f'Oznaczono jako odebrane: {updated}')
+        return redirect('all_donation')
+
+
+class PickupPlanView(StaffRequiredMixin, View):
+    query_budget = 4
+
+    def get(self, request):
+        try:
+            pick_up_date = date.fromisoformat(request.GET.get('date', ''))
+        except ValueError:
+            pick_up_date = date.today()
+        groups = pickup_plan(pick_up_date)
+
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'date': pick_up_date.isoformat(), 'groups': groups})
+        context = {
+            'pick_up_date': pick_up_date,
+            'groups': groups,
+            'total_bags': sum(group['bags'] for group in groups),
+        }
+        return render(request, 'pickup_plan.html', context)
+
+
+class DonationAnalyticsView(StaffRequiredMixin, View):
+    query_budget = 6
+    past_weeks = 12
+    upcoming_weeks = 4
+
+    def get(self, request):
+        form = RollupFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        data = form.cleaned_data
+        date_to = data['date_to'] or date.today() + timedelta(weeks=self.upcoming_weeks)
+        date_from = data['date_from'] or date.today() - timedelta(weeks=self.past_weeks)
+        group = data['group'] or 'both'
+        rows = list(weekly_rollups(date_from, date_to, group, data['institution'], data['category']))
+
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'date_from': date_from, 'date_to': date_to, 'group': group, 'weeks': rows})
+        context = {
+            'form': form,
+            'date_from': date_from,
+            'date_to': date_to,
+            'group': group,
+            'rows': rows,
+            'totals': {field: sum(row[field] for row in rows) for field in ROLLUP_FIELDS},
+        }
+        return render(request, 'analytics.html', context)
+
+
+class DonationExportView(StaffRequiredMixin, View):
+    read_replica = True
+
+    def get(self, request):
+        form = DonationFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f'Nieznany format: {export_format}'}, status=400)
+
+        # The body streams after the middleware has left the replica context,
+        # so the alias is fixed while it still applies.
+        model = donation_model(history_filter(request))
+        donations = form.filter(model.objects.using(router.db_for_read(model)))
+        response = StreamingHttpResponse(stream_export(export_format, donations),
+                                         content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="dary.{export_format}"'
+        return response
+
+
+class ThrottleStatsView(StaffRequiredMixin, View):
+    def get(self, request):
+        # Every blocked login or reset is a password hash or an email not done.
+        return JsonResponse({'scopes': throttle_stats(), 'rules': settings.THROTTLE_RULES})
+
+
+class TemplateProfileView(StaffRequiredMixin, View):
     def get(self, request):
-        donations_f = Donation.objects.filter(is_taken=False)
-        donations_t = Donation.objects.filter(is_taken=True)
-        return render(request, 'all_donations.html', {'donations_f': donations_f, 'donations_t': donations_t})
+        rows = template_profiler.snapshot()
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'enabled': template_profiler.is_installed(), 'nodes': rows})
+        return render(request, 'template_profile.html', {'enabled': template_profiler.is_installed(), 'rows': rows})
+
+    def post(self, request):
+        template_profiler.reset()
+        return redirect('template_profile')
 
 
 class DonationUpdateView(UpdateView):
@@ -296,8 +552,10 @@ class SuccessView(View):
 
 
 class AllInstitutionView(StaffRequiredMixin, View):
+    read_replica = True
+
     def get(self, request):
-        all_institution = Institution.objects.all()
+        all_institution = Institution.objects.prefetch_related('category')
         context = {
             'all_institution': all_institution
         }
@@ -330,15 +588,40 @@ class CategoryCreateView(CreateView):
 
 
 class UserDonation(LoginRequiredMixin, View):
+    query_budget = 8
+    paginate_by = 20
+
     def get(self, request):
-        user_donation_f = Donation.objects.filter(user=request.user, is_taken=False)
-        user_donation_t = Donation.objects.filter(user=request.user, is_taken=True)
-        date_now = datetime.now().date()
+        is_taken = is_taken_filter(request)
+        history = history_filter(request)
+        user_donations, per_institution, donations = self.get_querysets(request.user, is_taken, history)
+        summary = user_donations.aggregate(total_quantity=Sum('quantity'), donation_count=Count('id'))
+        page = keyset_paginate(donations, request.GET.get('cursor'), self.paginate_by)
+        return render(request, 'user_donation.html',
+                      self.get_context(is_taken, summary, per_institution, page, history))
 
-        context = {
-            'user_donation_f': user_donation_f,
-            'user_donation_t': user_donation_t,
-            'date_now': date_now,
-        }
+    @staticmethod
+    def get_querysets(user, is_taken, history=False):
+        user_donations = donation_model(history).objects.filter(user=user)
+        per_institution = (user_donations.values('institution__name')
+                           .annotate(total_quantity=Sum('quantity'), donation_count=Count('id'))
+                           .order_by('-total_quantity', 'institution__name'))
+
+        donations = user_donations.select_related('user', 'institution').prefetch_related('categories')
+        if is_taken is not None:
+            donations = donations.filter(is_taken=is_taken)
+        return user_donations, per_institution, donations
 
-        return render(request, 'user_donation.html', context)
+    @staticmethod
+    def get_context(is_taken, summary, per_institution, page, history=False):
+        return {
+            'page': page,
+            'is_taken': is_taken,
+            'history': history,
+            'filter_query': filter_query(history=1 if history else None,
+                                         is_taken=None if is_taken is None else int(is_taken)),
+            'total_quantity': summary['total_quantity'] or 0,
+            'donation_count': summary['donation_count'],
+            'per_institution': per_institution,
+            'date_now': datetime.now().date(),
+        }
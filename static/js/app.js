@@ -271,6 +271,7 @@ document.querySelector('div[data-step="1"]').addEventListener('click', () => {
         selectedCategories.push(checkbox.value);
     });
 
+    filterInstitutions([...checkedCheckboxes].map(checkbox => checkbox.dataset.id));
     updateSummaryText();
 });
 
@@ -312,6 +313,34 @@ document.querySelector('div[data-step="4"]').addEventListener('click', () => {
     updateSummaryText();
 });
 
+let filteredCategories = null;
+
+function filterInstitutions(categoryIds) {
+  const step = document.querySelector('#step-3');
+  const key = categoryIds.join(',');
+  if (step === null || key === filteredCategories) {
+    return;
+  }
+  filteredCategories = key;
+
+  fetch(`${step.dataset.matchesUrl}?categories=${key}`)
+    .then(response => response.json())
+    .then(data => {
+      const buttons = step.querySelector('.form-group--buttons');
+      const groups = new Map();
+      step.querySelectorAll('[data-institution]').forEach(group => {
+        group.hidden = true;
+        groups.set(group.dataset.institution, group);
+      });
+      data.institutions.forEach(institution => {
+        const group = groups.get(String(institution.id));
+        if (group !== undefined) {
+          group.hidden = false;
+          step.insertBefore(group, buttons);
+        }
+      });
+    });
+}
 
 "step 6"
 function updateSummaryText() {